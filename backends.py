@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""File system backends of the tests
+
+The functional tests, the metadata benchmarks and the fixture pools make file, permission and ACL operations
+through the current backend ("backends.current", chosen with "--backend os|memory"):
+    OsBackend - the real file system, the operations are the functions of the os module
+    MemoryBackend - a file tree in memory; permissions are checked by the NFSv4 ACL of every file (RFC 8881)
+        or by the ACL made from the mode bits if the ACL is not set, like an NFS server does; the user is the
+        current user without the privileges of root
+    LatencyBackend - a wrapper adding a delay (latency and random jitter, "--latency MS", "--jitter MS")
+        to every operation of another backend, like a mount with a high RTT
+The memory backend runs the suite without an NFS server, the latency backend reproduces slow mounts; both let
+to benchmark the overhead of the test harness itself. The test groups using the file system directly (data
+throughput, mmap, locks, etc.) require the "posix" capability, which only the real file system has.
+"""
+
+import io
+import os
+import stat
+import time
+import errno
+import random
+import shutil
+import threading
+import subprocess
+
+import cache
+import nfs4acl
+
+
+class Backend:
+    """Base class of the backends: the operations made of other operations of the backend"""
+
+    name = None
+    capabilities = ()  # capabilities the backend can have, they are checked for every testing folder
+    acl_model = 'nfs4'  # how the ACL decides permissions: 'nfs4' (RFC 7530) or 'posix' (NFSv4 ACL mapped to POSIX ACL)
+
+    def add_ace(self, path, ace, index=0):
+        """Inserts the ACE to the ACL of the file; by default the ACE is inserted first, like "nfs4_setfacl -a" does
+
+        The ACE can be given in the nfs4_setfacl text format.
+        """
+        if isinstance(ace, str):
+            ace = nfs4acl.Ace.from_string(ace, self.isdir(path))
+        aces = self.get_acl(path)
+        aces.insert(index, ace)
+        self.set_acl(path, aces)
+
+    def get_acl_text(self, path):
+        """Returns the ACL of the file in the nfs4_getfacl text format"""
+        return nfs4acl.format_acl(self.get_acl(path))
+
+    def isfile(self, path):
+        try:
+            return stat.S_ISREG(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def isdir(self, path):
+        try:
+            return stat.S_ISDIR(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def exists(self, path):
+        try:
+            self.stat(path)
+        except OSError:
+            return False
+        return True
+
+
+class OsBackend(Backend):
+    """The real file system"""
+
+    name = "os"
+    capabilities = ('posix', 'nfs', 'nfs4_acl')
+    acl_model = 'posix'  # the NFS server of the Prerequisites (Linux knfsd) stores NFSv4 ACL as POSIX ACL
+
+    def open(self, path, mode='r'):
+        """Opens the file like the built-in open(), the cache policy is applied (see cache module)"""
+        file = open(path, mode=mode, opener=cache.opener)
+        if cache.drops_pages(unaligned=True) and any(char in mode for char in 'wax+'):
+            return cache.DropOnClose(file)
+        return file
+
+    def open_flags(self, path, flags, mode=0o666):
+        """Opens the file with os.open() flags, returns the object with the close() method"""
+        return os.fdopen(os.open(path, flags, mode),
+                         mode='rb' if flags & os.O_ACCMODE == os.O_RDONLY else 'wb', buffering=0)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def rename(self, source, target):
+        os.rename(source, target)
+
+    def mkdir(self, path, mode=0o777):
+        os.mkdir(path, mode)
+
+    def rmdir(self, path):
+        os.rmdir(path)
+
+    def rmtree(self, path):
+        shutil.rmtree(path)
+
+    def listdir(self, path):
+        return os.listdir(path)
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def access(self, path, mode):
+        return os.access(path, mode)
+
+    def chmod(self, path, mode):
+        os.chmod(path, mode)
+
+    def chown(self, path, uid, gid):
+        os.chown(path, uid, gid)
+
+    def get_acl(self, path):
+        return nfs4acl.get_acl(path)
+
+    def set_acl(self, path, aces):
+        nfs4acl.set_acl(path, aces)
+
+    def run(self, path):
+        """Runs the file, returns its output"""
+        return subprocess.run([path], stdout=subprocess.PIPE, check=False).stdout.decode()
+
+
+class Node:
+    """A file or a folder of the memory backend"""
+
+    inode_numbers = iter(range(1, 2 ** 63))
+
+    def __init__(self, kind, mode, uid, gid):
+        self.kind = kind  # stat.S_IFREG or stat.S_IFDIR
+        self.mode = mode
+        self.uid = uid
+        self.gid = gid
+        self.acl = None  # list of ACEs or None if the ACL is made from the mode
+        self.data = bytearray()
+        self.children = {}
+        self.inode = next(Node.inode_numbers)
+        self.mtime = self.ctime = time.time()
+
+
+class MemoryFile(io.BytesIO):
+    """An open file of the memory backend; the content is written to the file node by flush() and close()"""
+
+    def __init__(self, node, reading, writing, append):
+        super().__init__(bytes(node.data))
+        self.node = node
+        self.reading = reading
+        self.writing = writing
+        if append:
+            self.seek(0, io.SEEK_END)
+
+    def readable(self):
+        return self.reading
+
+    def writable(self):
+        return self.writing
+
+    def read(self, size=-1):
+        if not self.reading:
+            raise io.UnsupportedOperation("not readable")
+        return super().read(size)
+
+    def write(self, data):
+        if not self.writing:
+            raise io.UnsupportedOperation("not writable")
+        return super().write(data)
+
+    def flush(self):
+        if self.writing and not self.closed:
+            self.node.data = bytearray(self.getvalue())
+            self.node.mtime = time.time()
+        super().flush()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class MemoryBackend(Backend):
+    """A file tree in memory with POSIX permissions and NFSv4 ACL"""
+
+    name = "memory"
+    capabilities = ('nfs4_acl',)
+    umask = 0o022
+
+    def __init__(self):
+        self.uid = os.geteuid()
+        self.gid = os.getegid()
+        self.groups = set(os.getgroups()) | {self.gid}
+        self.root = Node(stat.S_IFDIR, 0o755, 0, 0)
+        self.lock = threading.RLock()
+
+    # access checks
+
+    @staticmethod
+    def mode_acl(node):
+        """Returns the ACL equivalent to the mode bits of the node, like an NFS server shows it"""
+        def mask(bits, extra):
+            letters = extra + ('rn' if bits & 4 else '') + ('waN' if bits & 2 else '') + ('x' if bits & 1 else '')
+            if bits & 2 and node.kind == stat.S_IFDIR:
+                letters += 'D'
+            return nfs4acl.Ace.from_string("A::EVERYONE@:" + letters).access_mask
+
+        owner, group, other = (node.mode >> 6) & 7, (node.mode >> 3) & 7, node.mode & 7
+        aces = []
+        if (group | other) & ~owner:  # the owner has less permissions than others, they are denied explicitly
+            aces.append(nfs4acl.Ace(nfs4acl.ace_type_letters['D'], 0, mask((group | other) & ~owner, ""), "OWNER@"))
+        aces.append(nfs4acl.Ace(nfs4acl.ace_type_letters['A'], 0, mask(owner, "tTcCoy"), "OWNER@"))
+        if other & ~group:
+            aces.append(nfs4acl.Ace(nfs4acl.ace_type_letters['D'], 0, mask(other & ~group, ""), "GROUP@"))
+        aces.append(nfs4acl.Ace(nfs4acl.ace_type_letters['A'], 0, mask(group, "tcy"), "GROUP@"))
+        aces.append(nfs4acl.Ace(nfs4acl.ace_type_letters['A'], 0, mask(other, "tcy"), "EVERYONE@"))
+        return aces
+
+    def matches(self, ace, node):
+        """Checks if the principal of the ACE is the current user"""
+        if ace.who == "OWNER@":
+            return node.uid == self.uid
+        if ace.who == "GROUP@":
+            return node.gid in self.groups
+        if ace.who == "EVERYONE@":
+            return True
+        identifier = ace.who.split('@', 1)[0]
+        if ace.flag & nfs4acl.ace_flag_letters['g']:
+            return identifier in {str(group) for group in self.groups}
+        return identifier == str(self.uid)
+
+    def permitted(self, node, letters):
+        """Checks if the ACL of the node permits all the permissions to the current user
+
+        ACEs are evaluated in order; the first ACE of the user containing a permission allows or denies it,
+        permissions not allowed by any ACE are denied.
+        """
+        remaining = nfs4acl.Ace.from_string("A::EVERYONE@:" + letters).access_mask
+        for ace in node.acl if node.acl is not None else self.mode_acl(node):
+            if ace.flag & nfs4acl.ace_flag_letters['i'] or not self.matches(ace, node):
+                continue
+            bits = ace.access_mask & remaining
+            if not bits:
+                continue
+            if ace.type == nfs4acl.ace_type_letters['D']:
+                return False
+            if ace.type == nfs4acl.ace_type_letters['A']:
+                remaining &= ~bits
+                if not remaining:
+                    return True
+        return not remaining
+
+    def check(self, node, letters, path):
+        """Raises PermissionError if the ACL of the node doesn't permit the permissions"""
+        if not self.permitted(node, letters):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), path)
+
+    def check_delete(self, parent, node, path):
+        """Deleting is permitted by DELETE_CHILD of the folder or by DELETE of the object (RFC 8881, 6.2.1.3.2)"""
+        if not self.permitted(parent, 'D') and not self.permitted(node, 'd'):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), path)
+
+    # path resolution
+
+    def lookup(self, path):
+        """Returns the node of the path; every folder on the way must permit EXECUTE (search)"""
+        node = self.root
+        for name in os.path.abspath(path).split(os.sep)[1:]:
+            if not name:
+                continue
+            if node.kind != stat.S_IFDIR:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+            self.check(node, 'x', path)
+            if name not in node.children:
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+            node = node.children[name]
+        return node
+
+    def lookup_parent(self, path):
+        """Returns the node of the parent folder of the path and the name in it"""
+        parent_path, name = os.path.split(os.path.abspath(path))
+        parent = self.lookup(parent_path)
+        if parent.kind != stat.S_IFDIR:
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+        self.check(parent, 'x', path)
+        return parent, name
+
+    def makedirs(self, path):
+        """Creates the folder and its parents owned by the current user, without access checks"""
+        with self.lock:
+            node = self.root
+            for name in os.path.abspath(path).split(os.sep)[1:]:
+                if name:
+                    node = node.children.setdefault(name, Node(stat.S_IFDIR, 0o755, self.uid, self.gid))
+
+    # operations
+
+    def open_node(self, path, reading, writing, append=False, create=False, exclusive=False, truncate=False,
+                  mode=0o666):
+        with self.lock:
+            parent, name = self.lookup_parent(path)
+            node = parent.children.get(name)
+            if node is None:
+                if not create:
+                    raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+                self.check(parent, 'w', path)
+                node = parent.children[name] = Node(stat.S_IFREG, mode & ~self.umask & 0o7777, self.uid, self.gid)
+            else:
+                if exclusive:
+                    raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+                if node.kind == stat.S_IFDIR:
+                    raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+                self.check(node, ('r' if reading else '') + ('a' if append else 'w' if writing else ''), path)
+            if truncate:
+                node.data = bytearray()
+            return MemoryFile(node, reading, writing, append)
+
+    def open(self, path, mode='r'):
+        handle = self.open_node(path, reading='r' in mode or '+' in mode,
+                                writing=any(letter in mode for letter in 'wxa+'), append='a' in mode,
+                                create=any(letter in mode for letter in 'wxa'), exclusive='x' in mode,
+                                truncate='w' in mode)
+        return handle if 'b' in mode else io.TextIOWrapper(handle, encoding='utf-8')
+
+    def open_flags(self, path, flags, mode=0o666):
+        access_mode = flags & os.O_ACCMODE
+        return self.open_node(path, reading=access_mode in (os.O_RDONLY, os.O_RDWR),
+                              writing=access_mode in (os.O_WRONLY, os.O_RDWR), append=bool(flags & os.O_APPEND),
+                              create=bool(flags & os.O_CREAT), exclusive=bool(flags & os.O_EXCL),
+                              truncate=bool(flags & os.O_TRUNC), mode=mode)
+
+    def remove(self, path):
+        with self.lock:
+            parent, name = self.lookup_parent(path)
+            node = self.lookup(path)
+            if node.kind == stat.S_IFDIR:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+            self.check_delete(parent, node, path)
+            del parent.children[name]
+
+    def rename(self, source, target):
+        with self.lock:
+            source_parent, source_name = self.lookup_parent(source)
+            node = self.lookup(source)
+            self.check_delete(source_parent, node, source)
+            target_parent, target_name = self.lookup_parent(target)
+            self.check(target_parent, 'a' if node.kind == stat.S_IFDIR else 'w', target)
+            replaced = target_parent.children.get(target_name)
+            if replaced is not None and replaced is not node:
+                if replaced.kind == stat.S_IFDIR and (node.kind != stat.S_IFDIR or replaced.children):
+                    raise OSError(errno.ENOTEMPTY if replaced.children else errno.EISDIR,
+                                  os.strerror(errno.ENOTEMPTY if replaced.children else errno.EISDIR), target)
+                self.check_delete(target_parent, replaced, target)
+            del source_parent.children[source_name]
+            target_parent.children[target_name] = node
+
+    def mkdir(self, path, mode=0o777):
+        with self.lock:
+            parent, name = self.lookup_parent(path)
+            if name in parent.children:
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+            self.check(parent, 'a', path)
+            parent.children[name] = Node(stat.S_IFDIR, mode & ~self.umask & 0o7777, self.uid, self.gid)
+
+    def rmdir(self, path):
+        with self.lock:
+            parent, name = self.lookup_parent(path)
+            node = self.lookup(path)
+            if node.kind != stat.S_IFDIR:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+            if node.children:
+                raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), path)
+            self.check_delete(parent, node, path)
+            del parent.children[name]
+
+    def rmtree(self, path):
+        """Deletes the folder with its content; like shutil.rmtree() of the owner, the permissions of the content
+        are not checked"""
+        with self.lock:
+            parent, name = self.lookup_parent(path)
+            self.lookup(path)
+            del parent.children[name]
+
+    def listdir(self, path):
+        with self.lock:
+            node = self.lookup(path)
+            if node.kind != stat.S_IFDIR:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+            self.check(node, 'r', path)
+            return list(node.children)
+
+    def stat(self, path):
+        with self.lock:
+            node = self.lookup(path)
+            size = len(node.data) if node.kind == stat.S_IFREG else 4096
+            return os.stat_result((node.kind | node.mode, node.inode, 0, 1, node.uid, node.gid, size,
+                                   node.mtime, node.mtime, node.ctime))
+
+    def access(self, path, mode):
+        with self.lock:
+            try:
+                node = self.lookup(path)
+            except OSError:
+                return False
+            letters = ('r' if mode & os.R_OK else '') + ('w' if mode & os.W_OK else '') + \
+                      ('x' if mode & os.X_OK else '')
+            return self.permitted(node, letters)
+
+    def chmod(self, path, mode):
+        """Changes the mode; the ACL is made from the new mode, like setting the mode does on an NFS server"""
+        with self.lock:
+            node = self.lookup(path)
+            self.check(node, 'C', path)
+            node.mode = mode & 0o7777
+            node.acl = None
+            node.ctime = time.time()
+
+    def chown(self, path, uid, gid):
+        with self.lock:
+            node = self.lookup(path)
+            self.check(node, 'o', path)
+            if uid != -1:
+                node.uid = uid
+            if gid != -1:
+                node.gid = gid
+            node.ctime = time.time()
+
+    def get_acl(self, path):
+        with self.lock:
+            node = self.lookup(path)
+            self.check(node, 'c', path)
+            return list(node.acl if node.acl is not None else self.mode_acl(node))
+
+    def set_acl(self, path, aces):
+        with self.lock:
+            node = self.lookup(path)
+            self.check(node, 'C', path)
+            node.acl = list(aces)
+            node.ctime = time.time()
+
+    def run(self, path):
+        """Runs the script: the interpreter from its first line reads the content from the standard input"""
+        with self.lock:
+            node = self.lookup(path)
+            self.check(node, 'rx', path)
+            content = bytes(node.data)
+        if not content.startswith(b'#!'):
+            raise OSError(errno.ENOEXEC, os.strerror(errno.ENOEXEC), path)
+        interpreter = content.split(b'\n', 1)[0][2:].decode().split()
+        return subprocess.run(interpreter, input=content, stdout=subprocess.PIPE, check=False).stdout.decode()
+
+
+class LatencyBackend(Backend):
+    """Adds latency and random jitter (seconds) to every operation of the backend
+
+    The operations of the base class (add_ace(), isfile(), etc.) are made of the delayed operations, so they are
+    delayed as many times as many operations they make.
+    """
+
+    def __init__(self, backend, latency, jitter=0.0):
+        self.backend = backend
+        self.latency = latency
+        self.jitter = jitter
+        self.name = backend.name + "+latency"
+        self.capabilities = backend.capabilities
+        self.acl_model = backend.acl_model
+
+    def __getattr__(self, name):
+        operation = getattr(self.backend, name)
+        if not callable(operation):
+            return operation
+
+        def delayed(*arguments, **keywords):
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+            return operation(*arguments, **keywords)
+        return delayed
+
+
+backend_classes = {'os': OsBackend, 'memory': MemoryBackend}
+
+current = OsBackend()  # the backend of the tests, set by make_backend() in the beginning of the run
+
+
+def make_backend(name, dir_names, latency=0.0, jitter=0.0):
+    """Returns the backend by its name, the testing folders are created in the memory backend
+
+    If latency or jitter (seconds) is set, the backend is wrapped by LatencyBackend.
+    """
+    backend = backend_classes[name]()
+    if isinstance(backend, MemoryBackend):
+        for dir_name in dir_names:
+            backend.makedirs(dir_name)
+    if latency or jitter:
+        backend = LatencyBackend(backend, latency, jitter)
+    return backend
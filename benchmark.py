@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark results collected during the test run
+
+Benchmark test groups add their measurements with add_result(), the results are written to the log file
+after the tests results table.
+"""
+
+import math
+import logging
+
+results = []  # (TC ID, result description) tuples in the order of measurement
+
+size_suffixes = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def add_result(test, description):
+    """Adds the benchmark result of the test and writes it to the debug log; the TC ID is taken from the test's
+    short description"""
+    results.append((test.shortDescription().split(' ', 1)[0], description))
+    logging.debug(description)
+
+
+def parse_size(size):
+    """Converts a size like "4096", "64K", "16M" or "1G" to the number of bytes"""
+    size = size.strip().upper()
+    if size[-1:] in size_suffixes:
+        return int(size[:-1]) * size_suffixes[size[-1]]
+    return int(size)
+
+
+def parse_sizes(sizes):
+    """Converts a comma-separated list of sizes to the list of numbers of bytes"""
+    return [parse_size(size) for size in sizes.split(',') if size.strip()]
+
+
+def format_size(size):
+    """Converts the number of bytes to the shortest string like "64K" or "16M\""""
+    for suffix in ('G', 'M', 'K'):
+        if size >= size_suffixes[suffix] and size % size_suffixes[suffix] == 0:
+            return str(size // size_suffixes[suffix]) + suffix
+    return str(size)
+
+
+class Histogram:
+    """Latency histogram with fixed memory
+
+    Values (seconds) are counted in logarithmic buckets between min_value and max_value, values out of the range
+    are counted in the first and the last bucket. Percentiles are estimated with the relative error of a half
+    of the bucket width (about 6% with 20 buckets per decade), the memory doesn't depend on the number of values.
+    """
+
+    def __init__(self, min_value=1e-6, max_value=100.0, buckets_per_decade=20):
+        self.min_value = min_value
+        self.buckets_per_decade = buckets_per_decade
+        self.counts = [0] * (int(math.log10(max_value / min_value) * buckets_per_decade) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+
+    def add(self, value):
+        """Counts the value"""
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.log10(value / self.min_value) * self.buckets_per_decade) + 1, len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        """Adds counts of the other histogram with the same buckets"""
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, percent):
+        """Returns the estimated value below which the percent of the values are"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            cumulative_count += count
+            if cumulative_count >= rank:
+                break
+        # geometric middle of the bucket, limited with the really counted values
+        value = self.min_value * 10 ** ((index - 0.5) / self.buckets_per_decade)
+        return min(max(value, self.minimum), self.maximum)
+
+    def describe(self):
+        """Returns a short description: number of values, operations per second and latency percentiles"""
+        return "n={:<7}{:>10.0f} ops/s  p50={:.3f}ms p95={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+            self.count, self.count / self.total if self.total else 0.0,
+            self.percentile(50) * 1000, self.percentile(95) * 1000, self.percentile(99) * 1000, self.maximum * 1000)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Latency budgets of the tests
+
+A test declares the longest acceptable time of its tested operation with the decorator "@budgets.budget(0.5)"
+or with the "Latency budget: 0.5s" line in its docstring (the decorator wins). If the operation time of a passed
+test (the test time without setup, assertions and debug probes, see timing module) exceeds the budget, the test
+is recorded as "Overrun" - a performance failure. Tests without a budget are not checked.
+
+A budget doesn't stop a test blocked forever (e.g. an open() on a hard mount of a stalled server). With the test
+timeout ("--test-timeout SECONDS") the tests are run in worker processes and a worker running one test longer than
+the timeout is killed by the watchdog of the main process; the test is recorded as "Hung" and the rest of its
+shard is run in a new worker.
+"""
+
+import re
+
+overrun_status = "Overrun"
+hung_status = "Hung"
+
+
+def budget(seconds):
+    """Decorator of the test method declaring its latency budget (seconds)"""
+    def decorator(function):
+        function.latency_budget = seconds
+        return function
+    return decorator
+
+
+def parse_budget(docstring):
+    """Returns the budget (seconds) from the "Latency budget: 500ms" or "Latency budget: 0.5s" docstring line
+    or None"""
+    match = re.search(r'^\s*Latency budget:\s*([\d.]+)\s*(ms|s)\s*$', docstring or "", re.MULTILINE)
+    if match is None:
+        return None
+    return float(match.group(1)) / (1000 if match.group(2) == 'ms' else 1)
+
+
+def budget_of(test):
+    """Returns the budget (seconds) of the test case or None if the test has no budget"""
+    method = getattr(test, getattr(test, '_testMethodName', ''), None)
+    if method is None:  # error in a class fixture
+        return None
+    seconds = getattr(method, 'latency_budget', None)
+    return seconds if seconds is not None else parse_budget(method.__doc__)
+
+
+def check(record, seconds):
+    """Adds the budget and the headroom (seconds, negative if overrun) to the record of the test
+
+    A passed test exceeding the budget is marked as "Overrun".
+    """
+    record['budget'] = seconds
+    record['headroom'] = seconds - record['operation']
+    if record['status'] == "Success" and record['headroom'] < 0:
+        record['status'] = overrun_status
+        record['error'] = "Operation time {:.3f}s exceeds the latency budget {:.3f}s".format(
+            record['operation'], seconds)
+
+
+def format_budget(record):
+    """Returns the budget, the operation time and the headroom of the record for the results table
+    or an empty string if the test has no budget"""
+    if record.get('budget') is None:
+        return ""
+    percents = round(record['headroom'] / record['budget'] * 100) if record['budget'] else 0
+    # a headroom rounded to zero percents is written without a sign (not "-0%")
+    return "  budget {:.3f}s actual {:.3f}s headroom {:+.3f}s ({}%)".format(
+        record['budget'], record['operation'], record['headroom'], "{:+d}".format(percents) if percents else "0")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Page cache policy of the suite
+
+Right after a file is written its content is in the client page cache, so reading it back doesn't reach the server.
+The policy ("--cache-policy normal|direct|drop", written to the log header) decides how the tests and the benchmarks
+using the real file system read and write files:
+    normal - the page cache is used as usual,
+    direct - the data benchmarks reading and writing page-aligned buffers by blocks open the files with O_DIRECT,
+    drop - a written file is synced and its cached pages are dropped with posix_fadvise(POSIX_FADV_DONTNEED)
+        when it's closed, the cached pages of a file are also dropped before it's opened for reading.
+Buffered I/O (the files of the tests, text files) and memory-mapped I/O can't use O_DIRECT: local file systems
+reject unaligned O_DIRECT I/O. They are "unaligned", their cached pages are dropped with both direct and drop
+policies.
+"""
+
+import os
+import mmap
+
+policies = ('normal', 'direct', 'drop')
+policy = 'normal'
+
+alignment = mmap.PAGESIZE
+
+
+def set_policy(name):
+    """Sets the policy of the suite"""
+    global policy
+    if name not in policies:
+        raise ValueError("Cache policy must be one of " + ", ".join(policies) + ": " + name)
+    policy = name
+
+
+def open_flags(flags):
+    """Returns os.open() flags of page-aligned I/O with O_DIRECT added under the direct policy"""
+    return flags | os.O_DIRECT if policy == 'direct' else flags
+
+
+def drops_pages(unaligned=False):
+    """Checks if the cached pages are dropped: under the drop policy or under the direct policy, if the I/O is
+    unaligned (buffered or memory-mapped, can't use O_DIRECT)"""
+    return policy == 'drop' or (unaligned and policy == 'direct')
+
+
+def aligned_buffer(size):
+    """Returns a writable buffer of the size aligned to the page (anonymous memory mapping), usable with O_DIRECT"""
+    return mmap.mmap(-1, max(size, 1))
+
+
+def drop_fd(fd):
+    """Syncs the open file and asks the kernel to drop its cached pages, so it's read again from the server"""
+    os.fsync(fd)  # dirty pages are not dropped
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def drop(path):
+    """Syncs the file and asks the kernel to drop its cached pages (see drop_fd())"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        drop_fd(fd)
+    finally:
+        os.close(fd)
+
+
+def after_write(path, unaligned=False):
+    """Drops the cached pages of the written file (see drops_pages())"""
+    if drops_pages(unaligned):
+        drop(path)
+
+
+def before_read(path, unaligned=False):
+    """Drops the cached pages of the file before reading (see drops_pages())"""
+    if drops_pages(unaligned):
+        drop(path)
+
+
+def opener(path, flags):
+    """Opener of the built-in open() for buffered (unaligned) I/O applying the policy
+
+    The cached pages of an existing file opened for reading are dropped; with the normal policy the file
+    is only opened, no other file system calls are made.
+    """
+    if drops_pages(unaligned=True) and flags & os.O_ACCMODE != os.O_WRONLY and not flags & (os.O_TRUNC | os.O_EXCL):
+        try:
+            drop(path)
+        except FileNotFoundError:  # a new file is created
+            pass
+    return os.open(path, flags, 0o666)
+
+
+def aligned_opener(path, flags):
+    """Opener of the built-in open() for unbuffered page-aligned I/O (see open_flags()), the cached pages
+    are dropped by the caller with before_read() and after_write()"""
+    return os.open(path, open_flags(flags), 0o666)
+
+
+class DropOnClose:
+    """File object of buffered I/O dropping the cached pages of the file when it's closed (see after_write())"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            after_write(self.file.name, unaligned=True)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pool of pre-created test files
+
+On a mount with a high RTT creating, writing and changing permissions of a file before the checked step costs more
+than the step itself. A test group creates the files it needs in bulk in setUpClass ("cls.pool.fill()"), several
+files at the same time, and every test claims a ready file from the pool ("self.pool.claim('uuid')"). The time of
+filling the pool is kept in "filled" and written to the log separately from the times of the tests;
+claiming a file is a part of the setup phase of the test. If the pool has no file of the template left (e.g. the
+test is repeated), the file is created when it is claimed. The files are created through the current backend.
+"""
+
+import os
+import stat
+import time
+import uuid
+import collections
+import concurrent.futures
+
+import backends
+import timing
+
+# template name: (content, permissions or None to keep the default ones); "{}" in the content is the file value
+templates = {
+    'empty': ("", None),
+    'uuid': ("{}", None),
+    'script': ("#!/bin/sh\necho {}", stat.S_IRUSR),
+    'executable': ("#!/bin/sh\necho {}", stat.S_IXUSR | stat.S_IRUSR),
+    'read-only': ("", stat.S_IRUSR),
+    'write-only': ("{}", stat.S_IWUSR),
+}
+
+fill_workers = 8  # number of files created at the same time
+
+filled = []  # (group description, number of files, seconds) of every filled pool
+
+# a file of the pool: its full path and the random value written to its content according to the template
+Fixture = collections.namedtuple('Fixture', 'path value')
+
+
+def create_fixture(dirname, template):
+    """Creates a file of the template in the folder, returns the Fixture"""
+    content, permissions = templates[template]
+    value = str(uuid.uuid4())
+    path = os.path.join(dirname, template + "-" + value)
+    with backends.current.open(path, mode='x') as file:
+        file.write(content.format(value))
+    if permissions is not None:
+        backends.current.chmod(path, permissions)
+    return Fixture(path, value)
+
+
+class FixturePool:
+    """Files of the templates created in bulk in the test folder of a group"""
+
+    def __init__(self, dirname, counts, description=""):
+        """counts - number of files of every template, e.g. {'empty': 2, 'uuid': 1}"""
+        self.dirname = dirname
+        self.counts = counts
+        self.description = description
+        self.fixtures = {template: [] for template in counts}
+
+    def fill(self):
+        """Creates the files of all templates, fill_workers files at the same time"""
+        jobs = [template for template, count in sorted(self.counts.items()) for _ in range(count)]
+        start_time = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=fill_workers) as executor:
+            for template, fixture in zip(jobs, executor.map(lambda job: create_fixture(self.dirname, job), jobs)):
+                self.fixtures[template].append(fixture)
+        filled.append((self.description, len(jobs), time.perf_counter() - start_time))
+
+    def claim(self, template):
+        """Returns a ready file of the template and removes it from the pool; the time is the setup of the test"""
+        with timing.phase('setup'):
+            if self.fixtures.get(template):
+                return self.fixtures[template].pop()
+            return create_fixture(self.dirname, template)
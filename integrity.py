@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Data integrity of large files
+
+The content of a file is generated chunk by chunk from a seed, so it's reproducible and any chunk can be generated
+again without the rest of the file: a chunk is the random block of the seed rotated by a shift depending on the
+chunk number (misplaced chunks differ from the expected ones). Writing a file returns its manifest - the digest
+of every chunk. Verifying reads the file chunk by chunk into one buffer and compares the digests with the manifest;
+the chunk is generated again only if its digest differs, to find the offset of the first corrupted byte.
+The memory used doesn't depend on the file size (except the manifest: 20 bytes per chunk), so the files can be
+much larger than RAM.
+"""
+
+import os
+import random
+import hashlib
+
+import cache
+
+chunk_size = 1024 ** 2
+
+
+class Pattern:
+    """Reproducible content generated from the seed"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.block = random.Random(seed).getrandbits(chunk_size * 8).to_bytes(chunk_size, 'little')
+
+    def chunk(self, number, length=chunk_size):
+        """Returns the content of the chunk with the number, the last chunk of a file can be shorter"""
+        shift = (number * 2654435761 + self.seed) % chunk_size
+        return (self.block[shift:] + self.block[:shift])[:length]
+
+
+def chunks(size):
+    """Yields (number, offset, length) of the chunks of the file of the size"""
+    for number, offset in enumerate(range(0, size, chunk_size)):
+        yield number, offset, min(chunk_size, size - offset)
+
+
+def write_file(path, size, pattern):
+    """Writes the file of the size with the pattern, syncs it and drops its cached pages
+
+    Returns the manifest: the list of digests of the chunks.
+    """
+    manifest = []
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for number, offset, length in chunks(size):
+            data = memoryview(pattern.chunk(number, length))
+            manifest.append(hashlib.sha1(data).digest())
+            written = 0
+            while written < length:
+                written += os.write(fd, data[written:])
+        cache.drop_fd(fd)
+    finally:
+        os.close(fd)
+    return manifest
+
+
+def verify_file(path, size, pattern, manifest):
+    """Reads the file chunk by chunk and compares it with the manifest
+
+    Returns the list of offsets of the first corrupted byte of every corrupted chunk; if the file is shorter
+    or longer than the size, the offset of its end or the size is added.
+    """
+    corruptions = []
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, mode='rb', buffering=0) as file:
+        cache.drop_fd(file.fileno())
+        for number, offset, length in chunks(size):
+            read = 0
+            while read < length:
+                count = file.readinto(view[read:length])
+                if not count:
+                    break
+                read += count
+            if read < length:
+                corruptions.append(offset + first_difference(view[:read], pattern.chunk(number, read)))
+                return corruptions
+            if hashlib.sha1(view[:length]).digest() != manifest[number]:
+                corruptions.append(offset + first_difference(view[:length], pattern.chunk(number, length)))
+        if file.read(1):
+            corruptions.append(size)
+    return corruptions
+
+
+def first_difference(data, expected):
+    """Returns the offset of the first byte of the data different from the expected data or the length of the data"""
+    low, high = 0, len(data)
+    # binary search by comparing slices: the equal beginning is found without comparing the bytes one by one
+    while low < high:
+        middle = (low + high) // 2
+        if data[low:middle + 1] == expected[low:middle + 1]:
+            low = middle + 1
+        else:
+            high = middle
+    return low
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""NFS RPC statistics of a mount from /proc/self/mountstats
+
+The kernel keeps cumulative counters of every NFS mount. The difference of two snapshots taken before and after
+a test is the cost of the test on the wire: the number of every RPC operation, bytes sent and received,
+RTT and execute time. The counters belong to the mount, not to the process, so the statistics of a test
+are exact only if nothing else uses the mount at the same time (e.g. the tests are not run with "--workers"
+and the mount is not tested in several testing folders).
+"""
+
+import os
+import re
+import logging
+
+mountstats_path = "/proc/self/mountstats"
+mounts_path = "/proc/mounts"
+
+# operations shown in the summary table of the log file; the report file contains all operations
+summary_operations = ('LOOKUP', 'GETATTR', 'ACCESS', 'OPEN', 'SETATTR', 'WRITE', 'COMMIT')
+
+
+def unescape(name):
+    """Decodes octal escapes (like "\\040" for space) of the mount point name"""
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), name)
+
+
+def parse_device_line(line):
+    """Returns (mount point, file system type) from the "device ... mounted on ... with fstype ..." line"""
+    mount_point, _, fstype = line.split(' mounted on ', 1)[1].partition(' with fstype ')
+    return unescape(mount_point), fstype.split()[0] if fstype else ""
+
+
+def find_mount_point(path):
+    """Returns the mount point of the NFS mount containing the path or None if the path is not on NFS"""
+    path = os.path.realpath(path)
+    found_mount_point = None
+    try:
+        with open(mountstats_path, mode='r') as file:
+            for line in file:
+                if not line.startswith('device '):
+                    continue
+                mount_point, fstype = parse_device_line(line)
+                if not fstype.startswith('nfs'):
+                    continue
+                if path == mount_point or path.startswith(mount_point.rstrip('/') + '/'):
+                    if found_mount_point is None or len(mount_point) > len(found_mount_point):
+                        found_mount_point = mount_point
+    except OSError as error:
+        logging.debug("Mount statistics are not available: " + str(error))
+    return found_mount_point
+
+
+def describe_mount(path):
+    """Returns the description of the mount containing the path: mount point, file system type and mount options"""
+    path = os.path.realpath(path)
+    found_mount = None
+    try:
+        with open(mounts_path, mode='r') as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) < 4:
+                    continue
+                mount_point = unescape(fields[1])
+                if path == mount_point or path.startswith(mount_point.rstrip('/') + '/'):
+                    if found_mount is None or len(mount_point) >= len(found_mount[0]):
+                        found_mount = (mount_point, fields[2], fields[3])
+    except OSError as error:
+        logging.debug("Mounts are not available: " + str(error))
+    if found_mount is None:
+        return "unknown mount"
+    return "{} {} {}".format(*found_mount)
+
+
+def snapshot(mount_point):
+    """Returns the current counters of the mount
+
+    The snapshot is a dictionary: "operations" - per-operation counters (a list of numbers for every operation,
+    in the order of /proc/self/mountstats: operations, transmissions, major timeouts, bytes sent, bytes received,
+    queue time, RTT, execute time), "bytes" - the counters of the "bytes:" line.
+    """
+    operations = {}
+    byte_counters = []
+    in_mount = False
+    in_operations = False
+    with open(mountstats_path, mode='r') as file:
+        for line in file:
+            if line.startswith('device '):
+                if in_mount:
+                    break
+                in_mount = parse_device_line(line)[0] == mount_point
+                continue
+            if not in_mount:
+                continue
+            line = line.strip()
+            if line.startswith('bytes:'):
+                byte_counters = [int(value) for value in line.split()[1:]]
+            elif line == 'per-op statistics':
+                in_operations = True
+            elif in_operations and ':' in line:
+                name, values = line.split(':', 1)
+                operations[name] = [int(value) for value in values.split()]
+    return {'operations': operations, 'bytes': byte_counters}
+
+
+def delta(before, after):
+    """Returns the statistics between two snapshots
+
+    The result is a dictionary: "operations" - for every operation made at least once: number of operations,
+    bytes sent and received, average RTT and execute time (milliseconds); "read_bytes" and "write_bytes" -
+    bytes read and written by applications (buffered and direct).
+    """
+    operations = {}
+    for name, values in after['operations'].items():
+        before_values = before['operations'].get(name, [0] * len(values))
+        difference = [value - before_value for value, before_value in zip(values, before_values)]
+        if len(difference) < 8 or difference[0] <= 0:
+            continue
+        operations[name] = {'ops': difference[0],
+                            'bytes_sent': difference[3],
+                            'bytes_received': difference[4],
+                            'rtt': difference[6] / difference[0],
+                            'execute': difference[7] / difference[0]}
+
+    byte_difference = [value - before_value for value, before_value in zip(after['bytes'], before['bytes'])]
+    if len(byte_difference) < 4:
+        byte_difference = [0] * 4
+    return {'operations': operations,
+            'read_bytes': byte_difference[0] + byte_difference[2],  # normal and direct reads
+            'write_bytes': byte_difference[1] + byte_difference[3]}  # normal and direct writes
+
+
+def format_summary(statistics):
+    """Returns the short description of the summary operations, for example "LOOKUP 2, GETATTR 4\""""
+    return ", ".join("{} {}".format(name, statistics['operations'][name]['ops'])
+                     for name in summary_operations if name in statistics['operations'])
+
+
+def write_report(records, path):
+    """Writes RPC statistics of every test record to the report file"""
+    with open(path, mode='w') as file:
+        for record in sorted(records, key=lambda test_record: (test_record['description'], test_record.get('mount'))):
+            statistics = record.get('rpc')
+            if statistics is None:
+                continue
+            file.write(' '.join(filter(None, [record.get('mount'), record['description']])) + "\n")
+            for name, operation in sorted(statistics['operations'].items()):
+                file.write("    {:<20}{:>8} ops  sent {:>10} B  received {:>10} B  "
+                           "avg RTT {:>8.3f} ms  avg execute {:>8.3f} ms\n".format(
+                               name, operation['ops'], operation['bytes_sent'], operation['bytes_received'],
+                               operation['rtt'], operation['execute']))
+            file.write("    read {} B, written {} B\n\n".format(statistics['read_bytes'], statistics['write_bytes']))
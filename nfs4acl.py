@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""NFSv4 ACL operations via the "system.nfs4_acl" extended attribute
+
+The Linux NFS client exposes the ACL of a file as the "system.nfs4_acl" extended attribute in the XDR encoding
+of the NFSv4 "fattr4_acl" attribute (RFC 7530):
+    uint32 number of ACEs, then for every ACE: uint32 type, uint32 flag, uint32 access mask, opaque who<>
+The ACL is read with one os.getxattr() call and written with one os.setxattr() call, no external tools are used.
+ACEs are written and read in the text format of nfs4_setfacl/nfs4_getfacl: "type:flags:principal:permissions".
+"""
+
+import os
+import struct
+import collections
+
+xattr_name = "system.nfs4_acl"
+
+# ACE types
+ace_type_letters = {'A': 0,  # ACCESS_ALLOWED
+                    'D': 1,  # ACCESS_DENIED
+                    'U': 2,  # SYSTEM_AUDIT
+                    'L': 3}  # SYSTEM_ALARM
+
+# ACE flags
+ace_flag_letters = {'f': 0x1,  # FILE_INHERIT
+                    'd': 0x2,  # DIRECTORY_INHERIT
+                    'n': 0x4,  # NO_PROPAGATE_INHERIT
+                    'i': 0x8,  # INHERIT_ONLY
+                    'S': 0x10,  # SUCCESSFUL_ACCESS
+                    'F': 0x20,  # FAILED_ACCESS
+                    'g': 0x40,  # IDENTIFIER_GROUP
+                    'O': 0x80}  # INHERITED
+
+# ACE access mask bits
+ace_mask_letters = {'r': 0x1,  # READ_DATA / LIST_DIRECTORY
+                    'w': 0x2,  # WRITE_DATA / ADD_FILE
+                    'a': 0x4,  # APPEND_DATA / ADD_SUBDIRECTORY
+                    'n': 0x8,  # READ_NAMED_ATTRS
+                    'N': 0x10,  # WRITE_NAMED_ATTRS
+                    'x': 0x20,  # EXECUTE
+                    'D': 0x40,  # DELETE_CHILD
+                    't': 0x80,  # READ_ATTRIBUTES
+                    'T': 0x100,  # WRITE_ATTRIBUTES
+                    'd': 0x10000,  # DELETE
+                    'c': 0x20000,  # READ_ACL
+                    'C': 0x40000,  # WRITE_ACL
+                    'o': 0x80000,  # WRITE_OWNER
+                    'y': 0x100000}  # SYNCHRONIZE
+
+# generic permissions of nfs4_setfacl; generic write also contains DELETE_CHILD for folders
+ace_mask_aliases = {'R': 'rntcy',
+                    'W': 'watTNcCy',
+                    'X': 'xtcy'}
+
+
+class Ace(collections.namedtuple('Ace', 'type flag access_mask who')):
+    """NFSv4 access control entry"""
+    __slots__ = ()
+
+    @classmethod
+    def from_string(cls, text, is_directory=False):
+        """Creates an ACE from the nfs4_setfacl text format, for example "D::OWNER@:R" """
+        ace_type, flags, who, permissions = text.split(':')
+        letters = ''.join(ace_mask_aliases.get(letter, letter) for letter in permissions)
+        if is_directory and 'W' in permissions:
+            letters += 'D'
+        return cls(ace_type_letters[ace_type],
+                   sum(ace_flag_letters[letter] for letter in set(flags)),
+                   sum(ace_mask_letters[letter] for letter in set(letters)),
+                   who)
+
+    def __str__(self):
+        """Returns the ACE in the nfs4_getfacl text format, for example "A::OWNER@:rwatTnNcCy" """
+        type_letter = [letter for letter, ace_type in ace_type_letters.items() if ace_type == self.type]
+        return ':'.join([type_letter[0] if type_letter else str(self.type),
+                         ''.join(letter for letter, bit in ace_flag_letters.items() if self.flag & bit),
+                         self.who,
+                         ''.join(letter for letter, bit in ace_mask_letters.items() if self.access_mask & bit)])
+
+
+def decode_acl(data):
+    """Decodes the XDR encoded ACL to the list of ACEs"""
+    (count,) = struct.unpack_from('>I', data, 0)
+    offset = 4
+    aces = []
+    for _ in range(count):
+        ace_type, flag, access_mask, length = struct.unpack_from('>IIII', data, offset)
+        offset += 16
+        aces.append(Ace(ace_type, flag, access_mask, bytes(data[offset:offset + length]).decode('utf-8')))
+        offset += (length + 3) & ~3  # opaque data is padded to 4 bytes
+    return aces
+
+
+def encode_acl(aces):
+    """Encodes the list of ACEs to XDR"""
+    parts = [struct.pack('>I', len(aces))]
+    for ace in aces:
+        who = ace.who.encode('utf-8')
+        parts.append(struct.pack('>IIII', ace.type, ace.flag, ace.access_mask, len(who)))
+        parts.append(who + b'\0' * (-len(who) % 4))
+    return b''.join(parts)
+
+
+def get_acl(path):
+    """Returns the list of ACEs of the file"""
+    return decode_acl(os.getxattr(path, xattr_name))
+
+
+def set_acl(path, aces):
+    """Replaces the ACL of the file with the list of ACEs"""
+    os.setxattr(path, xattr_name, encode_acl(aces))
+
+
+def add_ace(path, ace, index=0):
+    """Inserts the ACE to the ACL of the file; by default the ACE is inserted first, like "nfs4_setfacl -a" does
+
+    The ACE can be given in the nfs4_setfacl text format.
+    """
+    if isinstance(ace, str):
+        ace = Ace.from_string(ace, os.path.isdir(path))
+    aces = get_acl(path)
+    aces.insert(index, ace)
+    set_acl(path, aces)
+
+
+def format_acl(aces):
+    """Returns the ACL in the nfs4_getfacl text format, one ACE per line"""
+    return '\n'.join(str(ace) for ace in aces)
+
+
+def get_acl_text(path):
+    """Returns the ACL of the file in the nfs4_getfacl text format"""
+    return format_acl(get_acl(path))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Lazy debug probes
+
+Debug messages often contain the state of the file system (if the file exists, if it is accessible, its ACL).
+Every such check is a file system call, on NFS it's usually an RPC to the server. A probe calls the check only
+if the debug log level is enabled, so usual runs make only the operations verified by the tests.
+The number and the time of the probe calls of the running test are counted, so the cost of the diagnostics
+in the debug run is known.
+"""
+
+import time
+import logging
+
+calls = 0  # number of the probe calls of the running test
+elapsed = 0.0  # time (seconds) of the probe calls of the running test
+
+
+def reset():
+    """Clears the counters before a new test"""
+    global calls, elapsed
+    calls = 0
+    elapsed = 0.0
+
+
+def debug(message, probe, *arguments):
+    """Writes the message followed by the result of the probe called with the arguments to the debug log
+
+    The probe is not called if the debug log level is not enabled.
+    """
+    global calls, elapsed
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    start_time = time.perf_counter()
+    value = probe(*arguments)
+    elapsed += time.perf_counter() - start_time
+    calls += 1
+    logging.debug(message + str(value))
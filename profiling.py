@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Profiling of the suite ("--profile")
+
+Every test and every class fixture (setUpClass, tearDownClass) is run under its own cProfile profiler and
+tracemalloc, so the overhead is paid only in a profiled run. The profiles are aggregated over the run (and over
+the worker processes) and written to the report:
+    1. the time of the run by phase: class setup, test setup, tested operations, logging, assertions, debug probes
+       and class teardown, in total and for every TC ID; logging is the time spent inside the logging module
+       (the formatting of the messages made by the caller before the call is a part of the caller's phase),
+    2. the class fixtures of every test group with their time, logging and memory,
+    3. the hot functions ranked by their own and by their cumulative time,
+    4. the allocation sites of the memory still allocated in the end of the run.
+The collapsed stacks file ("frame;frame;frame microseconds" lines) is read by flame graph tools (e.g. flamegraph.pl,
+speedscope). cProfile keeps only caller-callee pairs, so the stacks are rebuilt from the call graph: the time
+of a function called from several places is split between the stacks in proportion to the time of every call site.
+Only the thread running the test is profiled, threads of the tests (e.g. filling the fixture pools) are not.
+"""
+
+import io
+import os
+import time
+import pstats
+import cProfile
+import logging
+import tempfile
+import tracemalloc
+import collections
+
+import selection
+
+enabled = False
+stats = None  # pstats.Stats aggregated over the run, None until the first profile
+phases = {}  # TC ID (or the test description): {phase: seconds, 'runs': number of runs}
+fixtures = {}  # "Class.fixture": {'runs', 'time', 'logging', 'memory_peak', 'memory_net'} of the class fixtures
+
+phase_names = ('setup', 'operation', 'logging', 'assertions', 'probes')
+top_functions = 30  # number of the functions in every ranking of the report
+top_allocations = 10  # number of the allocation sites in the report
+min_stack_time = 1e-5  # stacks of the collapsed stacks file shorter than this (seconds) are not followed
+max_stack_depth = 100
+
+
+def enable():
+    """Enables profiling of the run"""
+    global enabled
+    enabled = True
+    tracemalloc.start()
+
+
+def reset():
+    """Clears the aggregated profiles (in a new worker process)"""
+    global stats
+    stats = None
+    phases.clear()
+    fixtures.clear()
+
+
+class Measurement:
+    """Profile, time and memory of one test or class fixture"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9
+            tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start_time = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        """Stops the measurement, adds the profile to the run; returns the measured values as a dictionary"""
+        self.profile.disable()
+        elapsed = time.perf_counter() - self.start_time
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        profile_stats = pstats.Stats(self.profile)
+        add_stats(profile_stats)
+        return {'time': elapsed,
+                'logging': logging_time(profile_stats.stats),
+                'memory_peak': peak_memory - self.start_memory if hasattr(tracemalloc, 'reset_peak') else None,
+                'memory_net': current_memory - self.start_memory}
+
+
+def add_stats(new_stats):
+    """Adds the pstats.Stats to the aggregated profile"""
+    global stats
+    if stats is None:
+        stats = new_stats
+    else:
+        stats.add(new_stats)
+
+
+def logging_time(function_stats):
+    """Returns the time (seconds) spent in the logging module called from outside of it"""
+    return sum(call[3] for function, (cc, nc, tt, ct, callers) in function_stats.items()
+               if function[0] == logging.__file__
+               for caller, call in callers.items() if caller[0] != logging.__file__)
+
+
+def instrument(test_classes):
+    """Runs setUpClass() and tearDownClass() of the test classes under the profiler"""
+    for test_class in test_classes:
+        for fixture_name in ('setUpClass', 'tearDownClass'):
+            method = getattr(test_class, fixture_name)
+            if getattr(method, 'profiled', False):
+                continue
+
+            def fixture(cls, method=method, name=test_class.__name__ + "." + fixture_name):
+                measurement = Measurement()
+                try:
+                    method()
+                finally:
+                    add_fixture(name, measurement.stop())
+            fixture.profiled = True
+            setattr(test_class, fixture_name, classmethod(fixture))
+
+
+def add_fixture(name, values, runs=1):
+    """Adds the measured values of the class fixture to the run"""
+    totals = fixtures.setdefault(name, {'runs': 0, 'time': 0.0, 'logging': 0.0, 'memory_peak': None,
+                                        'memory_net': 0})
+    totals['runs'] += runs
+    for key in ('time', 'logging', 'memory_net'):
+        totals[key] += values[key]
+    if values['memory_peak'] is not None:
+        totals['memory_peak'] = max(totals['memory_peak'] or 0, values['memory_peak'])
+
+
+def add_record(record):
+    """Adds the phases of the finished test to the run (a listener of the test results)"""
+    key = selection.tc_id(record['description']) or record['description']
+    totals = phases.setdefault(key, dict({phase: 0.0 for phase in phase_names}, runs=0))
+    totals['runs'] += 1
+    logging_seconds = record.get('logging', 0.0)
+    for phase in phase_names:
+        totals[phase] += logging_seconds if phase == 'logging' else record[phase]
+    # the logging calls of the test are made during its operation
+    totals['operation'] -= min(logging_seconds, record['operation'])
+
+
+def dump():
+    """Writes the aggregated profile of the worker process to a temporary file
+
+    Returns (file path or None, class fixtures) to be merged in the main process with merge().
+    """
+    if stats is None:
+        return None, fixtures
+    fd, path = tempfile.mkstemp(prefix="profile-", suffix=".prof")
+    os.close(fd)
+    stats.dump_stats(path)
+    return path, fixtures
+
+
+def merge(path, worker_fixtures):
+    """Adds the profile dumped by a worker process to the run"""
+    if path is not None:
+        add_stats(pstats.Stats(path))
+        os.remove(path)
+    for name, values in worker_fixtures.items():
+        add_fixture(name, values, values['runs'])
+
+
+def function_name(function):
+    """Returns a short name of the pstats function key: "file.py:line(function)" or the built-in name"""
+    filename, line, name = function
+    if filename == '~':
+        return name
+    return "{}:{}({})".format(os.path.basename(filename), line, name)
+
+
+def collapsed_stacks():
+    """Returns {stack: seconds} of the aggregated profile, the stack is "frame;frame;frame\""""
+    callees = {}
+    for function, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, call in callers.items():
+            callees.setdefault(caller, []).append((function, call[3]))
+
+    stacks = collections.Counter()
+
+    def walk(function, path, share, depth):
+        # share - the part of the time of the function spent in this stack
+        cc, nc, tt, ct, callers = stats.stats[function]
+        path = path + (function_name(function).replace(';', ','),)
+        stacks[';'.join(path)] += tt * share
+        if depth >= max_stack_depth:
+            return
+        for callee, call_time in callees.get(function, []):
+            callee_time = stats.stats[callee][3]
+            if callee_time > 0 and share * call_time >= min_stack_time and callee not in walking:
+                walking.add(callee)
+                walk(callee, path, share * call_time / callee_time, depth + 1)
+                walking.discard(callee)
+
+    for function, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if not callers:
+            walking = {function}
+            walk(function, (), 1.0, 0)
+    return stacks
+
+
+def write_report(report_path, stacks_path):
+    """Writes the report and the collapsed stacks file of the run, the phase totals are written to the log"""
+    totals = {phase: sum(values[phase] for values in phases.values()) for phase in phase_names}
+    class_setup = sum(values['time'] for name, values in fixtures.items() if name.endswith(".setUpClass"))
+    class_teardown = sum(values['time'] for name, values in fixtures.items() if name.endswith(".tearDownClass"))
+    logging.info("Profile: class setup {:.3f}s, ".format(class_setup)
+                 + ", ".join("{} {:.3f}s".format(phase, totals[phase]) for phase in phase_names)
+                 + ", class teardown {:.3f}s".format(class_teardown))
+
+    with open(report_path, mode='w') as report:
+        report.write("Time by phase (seconds)\n")
+        report.write("{:<16}".format("TC") + "".join("{:>12}".format(phase) for phase in phase_names)
+                     + "{:>8}\n".format("runs"))
+        for key, values in sorted(phases.items(), key=lambda item: -sum(item[1][phase] for phase in phase_names)):
+            report.write("{:<16}".format(key[:15]) + "".join("{:>12.6f}".format(values[phase])
+                                                            for phase in phase_names)
+                         + "{:>8}\n".format(values['runs']))
+        report.write("{:<16}".format("total") + "".join("{:>12.6f}".format(totals[phase]) for phase in phase_names)
+                     + "\n\n")
+
+        report.write("Class fixtures (seconds, memory in KB)\n")
+        for name, values in sorted(fixtures.items(), key=lambda item: -item[1]['time']):
+            report.write("{:<60}runs={:<5}time={:<12.6f}logging={:<12.6f}peak={:<10}net={}\n".format(
+                name, values['runs'], values['time'], values['logging'],
+                values['memory_peak'] // 1024 if values['memory_peak'] is not None else "-",
+                values['memory_net'] // 1024))
+
+        if stats is not None:
+            for sort_key, title in (('tottime', "own"), ('cumulative', "cumulative")):
+                report.write("\nHot functions by {} time\n".format(title))
+                stream = io.StringIO()
+                stats.stream = stream
+                stats.sort_stats(sort_key).print_stats(top_functions)
+                report.write(stream.getvalue())
+
+        if tracemalloc.is_tracing():
+            report.write("\nMemory still allocated in the end of the run\n")
+            # the memory of the profiles themselves is not reported
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, module.__file__)
+                                                                  for module in (pstats, cProfile)]
+                                                                 + [tracemalloc.Filter(False, __file__)])
+            for statistic in snapshot.statistics('lineno')[:top_allocations]:
+                report.write(str(statistic) + "\n")
+    logging.info("Profile report: " + report_path)
+
+    if stats is not None:
+        with open(stacks_path, mode='w') as file:
+            for stack, seconds in sorted(collapsed_stacks().items()):
+                microseconds = int(round(seconds * 1e6))
+                if microseconds:
+                    file.write("{} {}\n".format(stack, microseconds))
+        logging.info("Collapsed stacks: " + stacks_path)
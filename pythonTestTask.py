@@ -4,36 +4,344 @@
 import unittest
 import os
 import sys
+import time
+import uuid
+import queue
+import signal
 import logging
+import itertools
+import multiprocessing
 
-# search testing path in command-line arguments
-for arg in sys.argv:
-    if os.path.isdir(arg):
-        base_dir_name = arg
-        break
-    else:
-        base_dir_name = os.getcwd()  # default folder - current working folder
+import backends
+import benchmark
+import budgets
+import cache
+import fixtures
+import mountstats
+import probes
+import profiling
+import reports
+import selection
+import soak
+import timing
+
+# command-line options followed by a value, the values are not considered as a testing path
+value_options = ('--workers', '--local-dir', '--block-sizes', '--file-sizes', '--iterations',
+                 '--stress-workers', '--stress-iterations', '--depths', '--operations',
+                 '--jsonl', '--junit', '--baseline', '--baseline-threshold',
+                 '--rpc-report', '--large-file-size', '--dir-sizes', '--only', '--shard',
+                 '--second-mount', '--coherence-iterations', '--coherence-timeout',
+                 '--integrity-size', '--integrity-files', '--integrity-threads', '--integrity-seed',
+                 '--backend', '--latency', '--jitter', '--test-timeout',
+                 '--soak', '--soak-interval', '--soak-drift', '--exec-binaries', '--exec-iterations',
+                 '--evict-command', '--cache-policy', '--profile-report', '--profile-stacks')
+
+# search testing paths in command-line arguments; the suite is run in every path, the first one is the main path
+base_dir_names = [arg for index, arg in enumerate(sys.argv[1:], 1)
+                  if os.path.isdir(arg) and sys.argv[index - 1] not in value_options]
+base_dir_name = base_dir_names[0] if base_dir_names else os.getcwd()  # default folder - current working folder
+
+watchdog_interval = 1.0  # seconds between the checks of the running tests in the workers
+cleanup_timeout = 60.0  # seconds to wait for the removal of the test folders of the killed workers
 
 
 def main():
     """Main function where tests are run"""
 
-    from tests import testFileOperations
-    from tests import testFileAttributes
-    from tests import testNfs4Acl
-
     logging_setup()
 
-    loader = unittest.TestLoader()
+    # "--backend os|memory", "--latency MS" and "--jitter MS" command line arguments, the file system of the tests
+    backends.current = backends.make_backend(get_option_value('--backend', 'os'), base_dir_names or [base_dir_name],
+                                             float(get_option_value('--latency', 0)) / 1000,
+                                             float(get_option_value('--jitter', 0)) / 1000)
+    logging.info("File system backend: " + backends.current.name)
+    # "--cache-policy normal|direct|drop" command line argument, how the files are read and written (see cache module)
+    cache.set_policy(get_option_value('--cache-policy', 'normal'))
+    logging.info("Cache policy: " + cache.policy)
 
-    suite = loader.loadTestsFromModule(testFileOperations)
-    suite.addTests(loader.loadTestsFromModule(testFileAttributes))
-    suite.addTests(loader.loadTestsFromModule(testNfs4Acl))
+    # "--only TC001,TC1*" and "--shard N/M" command line arguments select the test cases to run
+    only = get_option_value('--only')
+    shard = get_option_value('--shard')
+    suite = selection.load_suite(sys.argv, base_dir_names or [base_dir_name],
+                                 patterns=only.split(',') if only is not None else None,
+                                 shard=selection.parse_shard(shard) if shard is not None else None)
 
-    runner = CustomTextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    # the baseline is read before the results files are opened, it can be the results file of the previous run
+    baseline_path = get_option_value('--baseline')
+    baseline = reports.read_records(baseline_path) if baseline_path is not None else None
+
+    # results of the tests are streamed to the files as soon as every test is finished
+    result_stream = reports.ResultStream(get_option_value('--jsonl', os.path.join(os.getcwd(), "results.jsonl")),
+                                         get_option_value('--junit', os.path.join(os.getcwd(), "results.xml")))
+    CustomTestResult.listeners.append(result_stream.write)
+
+    # RPC statistics of every test are collected, if the tested folder is on NFS
+    CustomTestResult.mount_point = find_nfs_mount_point(base_dir_name)
+    if CustomTestResult.mount_point is not None:
+        logging.info("NFS mount point: " + CustomTestResult.mount_point)
+    if '--profile' in sys.argv:  # "--profile" command line argument, the tests and class fixtures are profiled
+        profiling.enable()
+        profiling.instrument({type(test) for test in selection.iterate_tests(suite)})
+        CustomTestResult.listeners.append(profiling.add_record)
+    workers = int(get_option_value('--workers', 1))
+    # "--test-timeout SECONDS" command line argument, a test running longer is killed by the watchdog
+    test_timeout = get_option_value('--test-timeout')
+    if test_timeout is not None:
+        logging.info("Test timeout: " + test_timeout + "s")
+    soak_duration = get_option_value('--soak')
+    try:
+        if soak_duration is not None:
+            # "--soak DURATION" command line argument, the suite is run again and again, the records are not kept;
+            # "--soak-interval DURATION" and "--soak-drift PERCENT" - the interval of summaries and drift threshold
+            soak_run = soak.Soak(soak.parse_duration(soak_duration),
+                                 soak.parse_duration(get_option_value('--soak-interval', '10m')),
+                                 float(get_option_value('--soak-drift', 50)))
+            CustomTestResult.keep_results = False
+            CustomTestResult.listeners.append(soak_run.add)
+            tests = list(selection.iterate_tests(suite))  # a suite drops its tests when they are run
+
+            def run_round():
+                run_suite(unittest.TestSuite(tests), workers, float(test_timeout) if test_timeout is not None else None)
+                # the benchmark results and the fixture pools of every round are not kept either
+                benchmark.results.clear()
+                fixtures.filled.clear()
+            soak_run.run(run_round)
+            write_profile_report()
+            return
+        result = run_suite(suite, workers, float(test_timeout) if test_timeout is not None else None)
+    finally:
+        result_stream.close()
     write_results_to_log(result)
 
+    records = [record for test, status, record in result.test_results]
+    if baseline is not None:  # "--baseline PATH" command line argument, times are compared with the previous run
+        threshold = float(get_option_value('--baseline-threshold', 20))
+        reports.write_regressions_to_log(reports.compare_with_baseline(records, baseline, threshold), threshold)
+
+    if any(record.get('rpc') for record in records):  # some testing folders are on NFS
+        mountstats.write_report(records, get_option_value('--rpc-report', os.path.join(os.getcwd(), "rpc_report.txt")))
+    write_profile_report()
+
+
+def write_profile_report():
+    """Writes the profile report and the collapsed stacks file, if the run is profiled"""
+    if profiling.enabled:
+        profiling.write_report(get_option_value('--profile-report', os.path.join(os.getcwd(), "profile_report.txt")),
+                               get_option_value('--profile-stacks', os.path.join(os.getcwd(), "profile.collapsed")))
+
+
+def run_suite(suite, workers, test_timeout=None):
+    """Runs the test suite, returns the CustomTestResult instance
+
+    The suite is run in worker processes (see run_parallel()) if there are several workers, several testing paths
+    or the test timeout (seconds) is set.
+    """
+    if workers > 1 or len(base_dir_names) > 1 or test_timeout is not None:
+        return run_parallel(suite, workers, base_dir_names or [base_dir_name], test_timeout)
+    runner = CustomTextTestRunner(verbosity=2)
+    return runner.run(suite)
+
+
+def find_nfs_mount_point(dir_name):
+    """Returns the NFS mount point of the testing folder or None if it's not on NFS or the backend is not the real
+    file system"""
+    return mountstats.find_mount_point(dir_name) if 'nfs' in backends.current.capabilities else None
+
+
+def get_option_value(option, default=None):
+    """Returns the value following the option in the command line or the default value if the option is absent"""
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+
+def run_parallel(suite, workers, dir_names, test_timeout=None):
+    """Runs the test suite in parallel worker processes in every testing folder
+
+    Test cases are distributed round-robin between the shards, the number of shards is the number of workers.
+    Every shard is run in every testing folder at the same time, one worker process per shard and folder.
+    Every worker runs its shard as a separate suite, so the class fixtures are set up once per worker.
+    Results of the workers are merged back into one CustomTestResult instance. If there are several testing
+    folders, the records and benchmark results are labelled with the folder label ("M1", "M2", ...).
+    If the test timeout (seconds) is set, a worker silent for a longer time (e.g. blocked on a stalled server
+    in a test or a class fixture) is killed, its running test is recorded as hung and the rest of the shard is run
+    in a new worker. A worker exited without finishing its shard is reported the same way. The class fixtures
+    of a killed worker don't remove its test folders, they are removed by a cleaning process started after the kill.
+    """
+    tests = list(selection.iterate_tests(suite))
+    tests_by_id = {test.id(): test for test in tests}
+    shards = [shard for shard in ([test.id() for test in tests[i::workers]] for i in range(workers)) if shard]
+
+    result = CustomTestResult()
+    if len(dir_names) > 1:
+        result.mounts = [("M" + str(number), dir_name, mountstats.describe_mount(dir_name))
+                         for number, dir_name in enumerate(dir_names, 1)]
+        for label, dir_name, description in result.mounts:
+            logging.info(label + " " + dir_name + ": " + description)
+    labelled_dir_names = [(label, dir_name) for label, dir_name, description in result.mounts] or [(None, dir_names[0])]
+
+    start_time = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    messages = context.Queue()
+    numbers = itertools.count()
+    # worker number: its process, shard, testing folder, test folders, label, last started test id, if it's
+    # finished and the time of the last message of the worker (the watchdog measures the silence of the worker)
+    running = {}
+    started = 0
+    cleaners = []  # (process removing the test folders of a killed worker, test folders)
+
+    def start_worker(test_ids, dir_name, label):
+        number = next(numbers)
+        # every test class of the shard gets its own test folder, the names are known here to remove the folders
+        # of a killed worker
+        folders = {test_id.rpartition('.')[0]: os.path.join(dir_name, "test-" + str(uuid.uuid4()))
+                   for test_id in test_ids}
+        # processes are not daemonic (unlike pool workers), so the tests can start their own processes
+        process = context.Process(target=run_shard, args=(messages, test_ids, dir_name, folders, label, number))
+        process.start()
+        running[number] = {'process': process, 'tests': test_ids, 'dir_name': dir_name, 'folders': folders,
+                           'label': label, 'test': None, 'finished': True, 'last_message': time.perf_counter()}
+
+    def stop_worker(number, error):
+        """Kills the worker, records its running test as hung and runs the rest of its shard in a new worker
+
+        If no test is running (the worker is in a class fixture), the next test of the shard is recorded as hung,
+        so a class fixture blocked every time doesn't make the workers restart forever.
+        """
+        worker = running.pop(number)
+        os.kill(worker['process'].pid, signal.SIGKILL)  # Process.kill() requires Python 3.7
+        worker['process'].join()
+        # the folders are removed in another process, so a stalled server doesn't block the watchdog
+        folders = sorted(worker['folders'].values())
+        cleaner = context.Process(target=remove_folders, args=(folders,))
+        cleaner.start()
+        cleaners.append((cleaner, folders))
+        index = worker['tests'].index(worker['test']) if worker['test'] is not None else -1
+        if worker['finished']:
+            index += 1
+            error += " (in a class fixture)"
+        if index == len(worker['tests']):  # the last class fixture of the shard
+            logging.error("Worker in " + worker['dir_name'] + " after the last test of its shard: " + error)
+            return
+        test = tests_by_id[worker['tests'][index]]
+        record = make_hung_record(test, time.perf_counter() - worker['last_message'], error)
+        if worker['label'] is not None:
+            record['mount'] = worker['label']
+        logging.error(record['description'] + "\n" + error)
+        result.add_record(test, record)
+        result.testsRun += 1
+        if worker['tests'][index + 1:]:
+            start_worker(worker['tests'][index + 1:], worker['dir_name'], worker['label'])
+
+    for label, dir_name in labelled_dir_names:
+        for shard in shards:
+            start_worker(shard, dir_name, label)
+            started += 1
+    while running:
+        try:
+            message, number, content = messages.get(timeout=watchdog_interval)
+        except queue.Empty:
+            # all messages of an exited worker are received before the queue is empty
+            for number, worker in list(running.items()):
+                if worker['process'].exitcode is not None:
+                    stop_worker(number, "Worker exited with code {}".format(worker['process'].exitcode))
+            message = None
+        if message is not None and number not in running:  # a message of a killed worker
+            continue
+        if message is not None:
+            running[number]['last_message'] = time.perf_counter()
+        if message == "start":  # a test is started in a worker, the content is the test id
+            running[number]['test'], running[number]['finished'] = content, False
+        elif message == "result":  # a test is finished in a worker
+            result.add_record(tests_by_id.get(content['id']), content)
+            result.testsRun += 1
+            running[number]['finished'] = content['id'] == running[number]['test']
+        elif message == "fixtures":  # the fixture pools filled by a shard
+            fixtures.filled.extend(content)
+        elif message == "profile":  # the profile of a shard: the dumped profile file and the class fixtures
+            profiling.merge(*content)
+        elif message == "done":  # a shard is finished, the content is the list of its benchmark results
+            benchmark.results.extend(content)
+            running.pop(number)['process'].join()
+        if test_timeout is not None:
+            for number, worker in list(running.items()):
+                if time.perf_counter() - worker['last_message'] > test_timeout:
+                    stop_worker(number, "No message from the worker in {:.0f}s, it is killed".format(test_timeout))
+    cleanup_deadline = time.perf_counter() + cleanup_timeout
+    for cleaner, folders in cleaners:
+        cleaner.join(max(cleanup_deadline - time.perf_counter(), 0))
+        if cleaner.exitcode != 0:
+            logging.error("Test folders of a killed worker are not removed: " + ", ".join(folders))
+        if cleaner.is_alive():
+            os.kill(cleaner.pid, signal.SIGKILL)
+            cleaner.join()
+
+    logging.info("Ran {} tests in {:.3f}s using {} workers".format(
+        result.testsRun, time.perf_counter() - start_time, started))
+    return result
+
+
+def make_hung_record(test, elapsed, error):
+    """Returns the record of the test, which was running in a killed worker for the time (seconds)"""
+    record = {'id': test.id(),
+              'description': test.shortDescription() or str(test),
+              'status': budgets.hung_status,
+              'error': error,
+              'time': elapsed,
+              'setup': 0.0,
+              'operation': elapsed,
+              'assertions': 0.0,
+              'probes': 0.0,
+              'probe_calls': 0,
+              'rpc': None}
+    seconds = budgets.budget_of(test)
+    if seconds is not None:
+        budgets.check(record, seconds)
+    return record
+
+
+def remove_folders(folders):
+    """Removes the test folders left by a killed worker (in a cleaning process)"""
+    for folder in folders:
+        if backends.current.exists(folder):
+            backends.current.rmtree(folder)
+
+
+def run_shard(messages, test_ids, dir_name, folders, label=None, number=0):
+    """Runs a shard of the test suite in a worker process in the testing folder
+
+    Each test class gets its own test folder "test-<uuid>" in the testing folder, so the workers don't share files;
+    folders is the dictionary of the folders by the test class name (the test id without the method name).
+    Puts ("start", worker number, test id) to the queue when every test is started, ("result", worker number,
+    test record) as soon as every test is finished and ("fixtures", worker number, list of the filled fixture
+    pools), ("profile", worker number, the dumped profile of the shard) if the run is profiled and ("done", worker
+    number, list of benchmark results of the shard) in the end of the shard.
+    The label (if any) is added to the records, the fixture pools and the benchmark results.
+    """
+    profiling.reset()  # the profiles merged in the main process before the fork are not sent back
+    suite = unittest.TestLoader().loadTestsFromNames(test_ids)
+    for test in selection.iterate_tests(suite):
+        type(test).dirname = folders[test.id().rpartition('.')[0]]
+
+    def send_record(record):
+        if label is not None:
+            record['mount'] = label
+        messages.put(("result", number, record))
+
+    # the records are sent to the main process instead of the result files of the main process
+    CustomTestResult.listeners = [send_record]
+    CustomTestResult.start_listeners = [lambda test_id: messages.put(("start", number, test_id))]
+    CustomTestResult.mount_point = find_nfs_mount_point(dir_name)
+    suite.run(CustomTestResult())
+    if label is not None:
+        benchmark.results[:] = [(tc_id, label + " " + description) for tc_id, description in benchmark.results]
+        fixtures.filled[:] = [(label + " " + description, count, elapsed)
+                              for description, count, elapsed in fixtures.filled]
+    messages.put(("fixtures", number, fixtures.filled))
+    if profiling.enabled:
+        messages.put(("profile", number, profiling.dump()))
+    messages.put(("done", number, benchmark.results))
+
 
 def logging_setup():
     """Logging setup
@@ -64,29 +372,151 @@ def logging_setup():
 
 
 def write_results_to_log(result):
-    """Writes results in the end of testing to the log file in the sorted order"""
+    """Writes results in the end of testing to the log file in the sorted order
 
-    for i in sorted(result.test_results, key=lambda description: description[0].shortDescription()):
-        logging.info('{:.<60}'.format(i[0].shortDescription()) + i[1])
+    Every line contains the test description, the result, the test time, the number of the main RPC operations
+    made by the test (if the tested folder is on NFS) and the latency budget, the operation time and the headroom
+    (if the test has a budget). Results of several testing folders are written side by side.
+    The time of filling the fixture pools of the test groups is written after the results.
+    Benchmark results (if any) are written after the tests results, grouped by TC ID.
+    """
+
+    if result.mounts:
+        write_mounts_table_to_log(result)
+        test_results = []
+    else:
+        test_results = sorted(result.test_results, key=lambda test_result: test_result[2]['description'])
+    for test, status, record in test_results:
+        rpc_summary = "  " + mountstats.format_summary(record['rpc']) if record.get('rpc') else ""
+        logging.info('{:.<60}'.format(record['description']) + '{:<8}{:>9.3f}s'.format(status, record['time'])
+                     + rpc_summary + budgets.format_budget(record))
+
+    # the fixture pools are filled in setUpClass, their time is not a part of any test
+    for description, count, elapsed in sorted(fixtures.filled):
+        logging.info("Fixture pool of {}: {} files in {:.3f}s".format(description, count, elapsed))
+
+    probe_calls = sum(record['probe_calls'] for test, status, record in result.test_results)
+    if probe_calls:  # debug run
+        logging.debug("Debug probes made {} additional file system calls in {:.3f}s".format(
+            probe_calls, sum(record['probes'] for test, status, record in result.test_results)))
+
+    if benchmark.results:
+        logging.info("Benchmark results:")
+    # results of several testing folders start with the folder label, they are grouped by the label in every TC ID
+    for tc_id, description in sorted(benchmark.results, key=lambda benchmark_result: (
+            benchmark_result[0], benchmark_result[1].split(' ', 1)[0] if result.mounts else "")):
+        logging.info(tc_id + " " + description)
+
+
+def write_mounts_table_to_log(result):
+    """Writes results of the run in several testing folders side by side: the result and the time in every folder"""
+    labels = [label for label, dir_name, description in result.mounts]
+    rows = {}
+    for test, status, record in result.test_results:
+        rows.setdefault(record['description'], {})[record.get('mount')] = record
+
+    logging.info('{:<60}'.format("") + " | ".join('{:<18}'.format(label) for label in labels))
+    for description in sorted(rows):
+        cells = []
+        for label in labels:
+            record = rows[description].get(label)
+            cells.append('{:<8}{:>9.3f}s'.format(record['status'], record['time']) if record else '{:<18}'.format("-"))
+        logging.info('{:.<60}'.format(description) + " | ".join(cells))
 
 
 class CustomTestResult(unittest.TestResult):
-    """Overrides unittest.TestResult for custom test report"""
+    """Overrides unittest.TestResult for custom test report
+
+    Every finished test is added to test_results as (test, result, record) tuple. The record is a dictionary with
+    the test id, description, result, error and times (seconds) of the whole test and of its phases: setup,
+    operation and assertions (see timing module), the number and the time of debug probe calls (see probes
+    module). If mount_point is set, the record also contains RPC statistics of the test on this NFS mount
+    (see mountstats module) and, if the test has a latency budget, the budget and the headroom; a passed test
+    exceeding its budget is "Overrun" (see budgets module). In a profiled run the record also contains the logging
+    time and the memory allocated by the test (see profiling module). The record is passed to every function
+    in listeners as soon as the test is finished, the test id is passed to every function in start_listeners
+    when it's started.
+    """
     test_results = []
+    keep_results = True  # False in the soak mode, the records are only passed to the listeners
+    listeners = []
+    start_listeners = []
+    mount_point = None
+    mounts = []  # (label, testing folder, mount description) of every testing folder, if there are several folders
+
+    def startTest(self, test):
+        super().startTest(test)
+        timing.reset()
+        probes.reset()
+        self.status = None
+        self.error = None
+        self.rpc_snapshot = mountstats.snapshot(self.mount_point) if self.mount_point is not None else None
+        for listener in self.start_listeners:
+            listener(test.id())
+        self.measurement = profiling.Measurement() if profiling.enabled else None
+        self.start_time = time.perf_counter()
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        elapsed = time.perf_counter() - self.start_time
+        profile = self.measurement.stop() if self.measurement is not None else None
+        if self.status is not None:  # skipped tests are not recorded
+            self.record_result(test, elapsed, self.rpc_snapshot, profile)
+
+    def record_result(self, test, elapsed, rpc_snapshot=None, profile=None):
+        """Makes the record of the finished test; RPC statistics are counted from the snapshot (if any),
+        the logging time and the memory are taken from the profile of the test (if the run is profiled)"""
+        rpc = mountstats.delta(rpc_snapshot, mountstats.snapshot(self.mount_point)) if rpc_snapshot else None
+        setup = timing.phases.get('setup', 0.0)
+        assertions = timing.phases.get('assertions', 0.0)
+        probes_time = probes.elapsed
+        record = {'id': test.id(),
+                  'description': test.shortDescription() or str(test),
+                  'status': self.status,
+                  'error': self.error,
+                  'time': elapsed,
+                  'setup': setup,
+                  'operation': max(elapsed - setup - assertions - probes_time, 0.0),
+                  'assertions': assertions,
+                  'probes': probes_time,
+                  'probe_calls': probes.calls,
+                  'rpc': rpc}
+        if profile is not None:
+            record.update(logging=profile['logging'], memory_peak=profile['memory_peak'],
+                          memory_net=profile['memory_net'])
+        seconds = budgets.budget_of(test)
+        if seconds is not None:
+            budgets.check(record, seconds)
+            if record['status'] == budgets.overrun_status:
+                logging.error(record['description'] + "\n" + record['error'])
+        self.add_record(test, record)
+
+    def add_record(self, test, record):
+        """Adds the record of the finished test to the results and passes it to the listeners"""
+        if self.keep_results:
+            self.test_results.append((test, record['status'], record))
+        for listener in self.listeners:
+            listener(record)
 
     def addSuccess(self, test):  # Called when the test passed
-        self.test_results.append((test, "Success"))
+        self.status = "Success"
         logging.debug("Test passed\n")
 
     def addFailure(self, test, err):  # Called when the test failed
-        self.test_results.append((test, "Failed"))
+        self.status = "Failed"
+        self.error = self._exc_info_to_string(err, test)
         logging.error(test.shortDescription() + "\n" + str(err))
         logging.debug("Test failed\n")
 
     def addError(self, test, err):
-        self.test_results.append((test, "Failed"))
-        logging.error(test.shortDescription()+ "\n" + str(err))
+        self.status = "Failed"
+        self.error = self._exc_info_to_string(err, test)
+        logging.error((test.shortDescription() or str(test)) + "\n" + str(err))
         logging.debug("Test error\n")
+        if not isinstance(test, unittest.TestCase):  # error in a class fixture, there is no running test
+            timing.reset()
+            probes.reset()
+            self.record_result(test, 0.0)
 
 
 class CustomTextTestRunner(unittest.TextTestRunner):
@@ -96,4 +526,6 @@ class CustomTextTestRunner(unittest.TextTestRunner):
 
 
 if __name__ == "__main__":
+    # the test modules import this module by name; the alias keeps them from importing it once more as a new module
+    sys.modules['pythonTestTask'] = sys.modules[__name__]
     main()
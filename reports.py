@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Machine-readable test reports
+
+Results of the tests are streamed to a JSON Lines file and to a JUnit XML file as soon as every test finishes,
+so the results of the finished tests are kept even if the run hangs or is killed. The JUnit XML file is a complete
+document after every test: the closing tag is written after the last test case and overwritten by the next one,
+the counts of the <testsuite> element are updated in place (its start tag is padded to a fixed length).
+A JSON Lines file of a previous run can be used as a baseline for the timing regression check.
+"""
+
+import json
+import logging
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+import budgets
+
+# slowdowns smaller than this (seconds) are not considered as regressions, they are usually a noise
+min_regression_time = 0.01
+
+junit_start_tag_length = 200  # the start tag of <testsuite> is padded with spaces to this length
+
+
+class ResultStream:
+    """Writes test records to the JSON Lines and JUnit XML files, each record is flushed immediately"""
+
+    def __init__(self, jsonl_path, junit_path):
+        self.jsonl_file = open(jsonl_path, mode='w')
+        self.junit_file = open(junit_path, mode='w')
+        self.timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.counts = {'tests': 0, 'failures': 0, 'errors': 0, 'time': 0.0}
+        self.junit_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.start_tag_offset = self.junit_file.tell()
+        self.write_junit_start_tag()
+        self.junit_end = self.junit_file.tell()
+        self.write_junit_end_tag()
+
+    def write_junit_start_tag(self):
+        """Writes the start tag of <testsuite> with the current counts at its place in the JUnit XML file"""
+        start_tag = ('<testsuite name="pythonTestTask" timestamp={} tests="{}" failures="{}" errors="{}" '
+                     'time="{:.6f}"').format(
+            quoteattr(self.timestamp), self.counts['tests'], self.counts['failures'], self.counts['errors'],
+            self.counts['time'])
+        self.junit_file.seek(self.start_tag_offset)
+        self.junit_file.write(start_tag.ljust(junit_start_tag_length - 2) + '>\n')
+
+    def write_junit_end_tag(self):
+        """Writes the end tag of <testsuite> after the last test case, so the JUnit XML file is complete"""
+        self.junit_file.seek(self.junit_end)
+        self.junit_file.write('</testsuite>\n')
+        self.junit_file.truncate()
+        self.junit_file.flush()
+
+    def write(self, record):
+        """Writes the test record"""
+        self.jsonl_file.write(json.dumps(record, sort_keys=True) + "\n")
+        self.jsonl_file.flush()
+
+        # a hung test has no result (error), other unsuccessful tests have a wrong result (failure)
+        element = 'error' if record['status'] == budgets.hung_status else 'failure'
+        self.counts['tests'] += 1
+        self.counts['time'] += record['time']
+        if record['status'] != "Success":
+            self.counts[element + 's'] += 1
+        self.write_junit_start_tag()
+
+        class_name, _, test_name = record['id'].rpartition('.')
+        self.junit_file.seek(self.junit_end)
+        self.junit_file.write('  <testcase classname={} name={} time="{:.6f}">\n'.format(
+            quoteattr(class_name), quoteattr(record['description']), record['time']))
+        self.junit_file.write('    <properties>\n')
+        for phase in ('setup', 'operation', 'assertions', 'probes'):
+            self.junit_file.write('      <property name="{}" value="{:.6f}"/>\n'.format(phase, record[phase]))
+        self.junit_file.write('    </properties>\n')
+        if record['status'] != "Success":
+            self.junit_file.write('    <{} message={}>{}</{}>\n'.format(
+                element, quoteattr(record['status']), escape(record['error'] or ""), element))
+        self.junit_file.write('  </testcase>\n')
+        self.junit_end = self.junit_file.tell()
+        self.write_junit_end_tag()
+
+    def close(self):
+        """Closes the files (the JUnit XML document is already complete)"""
+        self.junit_file.close()
+        self.jsonl_file.close()
+
+
+def read_records(path):
+    """Reads test records from the JSON Lines file; an incomplete last line (of a hung run) is ignored
+
+    Returns the dictionary of the records by (testing folder label, test id).
+    """
+    records = {}
+    with open(path, mode='r') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[(record.get('mount'), record['id'])] = record
+    return records
+
+
+def compare_with_baseline(records, baseline, threshold):
+    """Compares the test times with the baseline records (read with read_records())
+
+    Returns the list of (record, baseline record) pairs of the tests, which are slower than in the baseline
+    by more than the threshold (percents).
+    """
+    regressions = []
+    for record in records:
+        baseline_record = baseline.get((record.get('mount'), record['id']))
+        if baseline_record is None or record['status'] != "Success" or baseline_record['status'] != "Success":
+            continue
+        if (record['time'] > baseline_record['time'] * (1 + threshold / 100)
+                and record['time'] - baseline_record['time'] > min_regression_time):
+            regressions.append((record, baseline_record))
+    return regressions
+
+
+def write_regressions_to_log(regressions, threshold):
+    """Writes the tests slower than in the baseline to the log file"""
+    if not regressions:
+        logging.info("No tests are slower than in the baseline by more than {}%".format(threshold))
+        return
+    logging.warning("Tests slower than in the baseline by more than {}%:".format(threshold))
+    for record, baseline_record in sorted(regressions, key=lambda regression: regression[0]['description']):
+        logging.warning('{:.<60}{:.3f}s (baseline {:.3f}s, +{:.0f}%)'.format(
+            ' '.join(filter(None, [record.get('mount'), record['description']])), record['time'],
+            baseline_record['time'],
+            (record['time'] / baseline_record['time'] - 1) * 100 if baseline_record['time'] else 0))
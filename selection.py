@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Selection of the test groups and test cases to run
+
+The test groups are listed in test_groups with the command line option adding the group (if the group is not run
+by default) and the capabilities of the tested folder the group requires (see detect_capabilities()). A group is
+skipped without importing its module if its option is absent or a required capability is missing in any testing
+folder.
+
+Test cases are selected by TC ID patterns ("--only TC001,TC1*") and split between machines ("--shard 2/4").
+TC IDs are read from the docstrings of the test methods in the source files, so the modules without selected
+test cases are not imported. The modules generating their test cases at import time (no TC IDs in the source)
+are imported and their test cases are selected after loading.
+"""
+
+import os
+import re
+import ast
+import fnmatch
+import logging
+import importlib
+import unittest
+
+import backends
+import mountstats
+
+# (module name in the "tests" package, command line option adding the group or None, required capabilities)
+test_groups = [
+    ('testFileOperations', None, ()),
+    ('testFileAttributes', None, ()),
+    ('testNfs4Acl', None, ('nfs4_acl',)),
+    ('testNfs4AclMatrix', None, ('nfs4_acl',)),
+    ('benchDataThroughput', '--benchmark', ('posix',)),
+    ('benchMetadataOperations', '--benchmark', ()),
+    ('benchConcurrentOperations', '--benchmark', ('posix',)),
+    ('benchMappedCopy', '--benchmark', ('posix',)),
+    ('benchDirectoryScaling', '--benchmark', ('posix',)),
+    ('benchExecLatency', '--benchmark', ('posix',)),
+    ('stressConcurrentAccess', '--stress', ('posix',)),
+    ('testClientCoherence', '--second-mount', ('posix', 'nfs')),
+    ('testDataIntegrity', '--integrity', ('posix',)),
+]
+
+tests_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+
+def tc_id(description):
+    """Returns the TC ID in the beginning of the test description or None"""
+    match = re.match(r'(TC\d+)\b', description or "")
+    return match.group(1) if match else None
+
+
+def find_tc_ids(module_name):
+    """Returns TC IDs of the test methods in the source file of the module without importing it"""
+    with open(os.path.join(tests_path, module_name + ".py"), mode='r') as file:
+        tree = ast.parse(file.read())
+    tc_ids = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('test'):
+            found_tc_id = tc_id(ast.get_docstring(node))
+            if found_tc_id is not None:
+                tc_ids.append(found_tc_id)
+    return tc_ids
+
+
+def matches(test_tc_id, patterns):
+    """Checks if the TC ID matches any of the patterns (shell-style wildcards, e.g. "TC1*")"""
+    return test_tc_id is not None and any(fnmatch.fnmatchcase(test_tc_id, pattern) for pattern in patterns)
+
+
+def supports_nfs4_acl(backend, path):
+    """Checks if the NFSv4 ACL of the folder can be read"""
+    try:
+        backend.get_acl(path)
+    except OSError as error:
+        logging.debug("NFSv4 ACL are not supported in " + path + ": " + str(error))
+        return False
+    return True
+
+
+def detect_capabilities(backend, dir_names):
+    """Returns the set of capabilities of the backend present in every testing folder
+
+    "posix" - the real file system, "nfs" - the folder is on NFS, "nfs4_acl" - NFSv4 ACL can be read.
+    """
+    capabilities = set(backend.capabilities)
+    for dir_name in dir_names:
+        if 'nfs' in capabilities and mountstats.find_mount_point(dir_name) is None:
+            capabilities.discard('nfs')
+        if 'nfs4_acl' in capabilities and not supports_nfs4_acl(backend, dir_name):
+            capabilities.discard('nfs4_acl')
+    return capabilities
+
+
+def load_suite(argv, dir_names, patterns=None, shard=None):
+    """Imports the selected test groups and returns the suite of the selected test cases
+
+    patterns - list of TC ID patterns or None to run all test cases of the groups,
+    shard - (shard number starting from 1, number of shards) or None to run all selected test cases.
+    """
+    capabilities = detect_capabilities(backends.current, dir_names)
+    logging.info("Capabilities of the testing folders: " + (", ".join(sorted(capabilities)) or "none"))
+
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for module_name, option, requirements in test_groups:
+        if option is not None and option not in argv:
+            continue
+        missing = [capability for capability in requirements if capability not in capabilities]
+        if missing:
+            logging.info("Skipping test group " + module_name + ": " + ", ".join(missing) + " not supported")
+            continue
+        if patterns is not None:
+            tc_ids = find_tc_ids(module_name)
+            if tc_ids and not any(matches(found_tc_id, patterns) for found_tc_id in tc_ids):
+                continue
+        module = importlib.import_module("tests." + module_name)
+        suite.addTests(loader.loadTestsFromModule(module))
+
+    if patterns is None and shard is None:
+        return suite
+    tests = [test for test in iterate_tests(suite)
+             if patterns is None or matches(tc_id(test.shortDescription()), patterns)]
+    if shard is not None:
+        number, count = shard
+        tests = tests[number - 1::count]
+    return unittest.TestSuite(tests)
+
+
+def parse_shard(text):
+    """Returns (shard number, number of shards) from the "N/M" text"""
+    number, count = (int(value) for value in text.split('/'))
+    if not 1 <= number <= count:
+        raise ValueError("Shard number must be from 1 to " + str(count) + ": " + text)
+    return number, count
+
+
+def iterate_tests(suite):
+    """Yields test cases from the (nested) test suite in the order they are run"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iterate_tests(test)
+        else:
+            yield test
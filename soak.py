@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Soak mode: the selected test groups are run again and again for a long time
+
+The records of the tests are not kept (the memory of the run doesn't grow with its duration). Every record is
+counted in fixed-size aggregates of its test: the number of runs, the number of failures and the histogram of the
+operation time (benchmark.Histogram). The aggregates of the whole run and of the current interval are kept; when
+the interval ends, its summary is written to the log and the drift of every test is checked:
+    1. the median operation time of the interval is slower than in the first interval of the test by more than
+       the threshold (percents),
+    2. the median operation time rises in every one of the last trend_intervals intervals (a slow creep below
+       the threshold),
+    3. the test fails in the interval, but it didn't fail in the first interval.
+The resident set size of the main process is written with every interval to catch leaks of the client.
+"""
+
+import os
+import re
+import time
+import logging
+import collections
+
+import benchmark
+
+trend_intervals = 4  # number of the intervals of the rising median reported as a creep
+min_drift_time = 0.001  # slowdowns of the median smaller than this (seconds) are not considered as a drift
+
+duration_units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(duration):
+    """Converts a duration like "90", "90s", "30m", "8h" or "2d" to the number of seconds"""
+    match = re.match(r'^\s*([\d.]+)\s*([smhd]?)\s*$', duration.lower())
+    if match is None:
+        raise ValueError("Duration must be a number with an optional unit s, m, h or d: " + duration)
+    return float(match.group(1)) * duration_units[match.group(2) or 's']
+
+
+def resident_set_size():
+    """Returns the current resident set size (kilobytes) of the process or None if it's unknown"""
+    try:
+        with open('/proc/self/statm', mode='r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return None
+
+
+class Aggregate:
+    """Number of runs, number of failures and the histogram of the operation time of a test"""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.histogram = benchmark.Histogram()
+
+    def add(self, record):
+        """Counts the record of the test"""
+        self.runs += 1
+        if record['status'] != "Success":
+            self.failures += 1
+        self.histogram.add(record['operation'])
+
+    def describe(self):
+        """Returns a short description: number of runs, failure rate and operation time percentiles"""
+        return "runs={:<7}failures={:<5}({:>5.1f}%)  p50={:.3f}ms p95={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+            self.runs, self.failures, self.failures / self.runs * 100 if self.runs else 0.0,
+            self.histogram.percentile(50) * 1000, self.histogram.percentile(95) * 1000,
+            self.histogram.percentile(99) * 1000, self.histogram.maximum * 1000)
+
+
+class Soak:
+    """Runs the rounds of the suite for the duration and aggregates the records (see add())"""
+
+    def __init__(self, duration, interval, drift_threshold):
+        """duration, interval - seconds, drift_threshold - percents"""
+        self.duration = duration
+        self.interval = interval
+        self.drift_threshold = drift_threshold
+        self.totals = {}  # test key: Aggregate of the whole run
+        self.current = {}  # test key: Aggregate of the current interval
+        self.first = {}  # test key: (median operation time, failures) of the first interval of the test
+        self.medians = {}  # test key: medians of the last intervals
+        self.intervals = 0
+        self.rounds = 0
+        self.first_rss = None
+        self.start_time = self.interval_start = time.perf_counter()
+
+    def run(self, run_round):
+        """Calls run_round() (runs the suite once) again and again until the duration is over"""
+        self.start_time = self.interval_start = time.perf_counter()
+        self.first_rss = resident_set_size()
+        logging.info("Soak for {:.0f}s, interval {:.0f}s, drift threshold {}%".format(
+            self.duration, self.interval, self.drift_threshold))
+        while time.perf_counter() - self.start_time < self.duration:
+            run_round()
+            self.rounds += 1
+        if any(aggregate.runs for aggregate in self.current.values()):
+            self.write_interval()
+        self.write_summary()
+
+    def add(self, record):
+        """Counts the record of a finished test (a listener of the test results)"""
+        key = ' '.join(filter(None, [record.get('mount'), record['description']]))
+        self.totals.setdefault(key, Aggregate()).add(record)
+        self.current.setdefault(key, Aggregate()).add(record)
+        if time.perf_counter() - self.interval_start >= self.interval:
+            self.write_interval()
+
+    def write_interval(self):
+        """Writes the summary of the current interval to the log, checks the drift and starts a new interval"""
+        self.intervals += 1
+        now = time.perf_counter()
+        runs = sum(aggregate.runs for aggregate in self.current.values())
+        failures = sum(aggregate.failures for aggregate in self.current.values())
+        rss = resident_set_size()
+        logging.info("Soak interval {} ({:.0f}s-{:.0f}s, {} rounds done): {} tests, {} failed, RSS {}".format(
+            self.intervals, self.interval_start - self.start_time, now - self.start_time, self.rounds, runs,
+            failures, "{} KB ({:+} KB)".format(rss, rss - self.first_rss) if rss and self.first_rss else "unknown"))
+
+        for key, aggregate in sorted(self.current.items()):
+            median = aggregate.histogram.percentile(50)
+            if key not in self.first:
+                self.first[key] = (median, aggregate.failures)
+            first_median, first_failures = self.first[key]
+            medians = self.medians.setdefault(key, collections.deque(maxlen=trend_intervals))
+            medians.append(median)
+
+            drifts = []
+            if (median > first_median * (1 + self.drift_threshold / 100)
+                    and median - first_median > min_drift_time):
+                drifts.append("median {:.3f}ms, first interval {:.3f}ms".format(median * 1000, first_median * 1000))
+            elif len(medians) == trend_intervals and all(
+                    earlier < later for earlier, later in zip(medians, list(medians)[1:])):
+                drifts.append("median rises in {} intervals: {}".format(
+                    trend_intervals, ", ".join("{:.3f}ms".format(value * 1000) for value in medians)))
+            if aggregate.failures and not first_failures:
+                drifts.append("{} failures, none in the first interval".format(aggregate.failures))
+            if drifts:
+                logging.warning("Drift of {}: {}".format(key, "; ".join(drifts)))
+            elif aggregate.failures:
+                logging.info('{:.<60}'.format(key) + aggregate.describe())
+
+        self.current = {}
+        self.interval_start = now
+
+    def write_summary(self):
+        """Writes the aggregates of the whole run to the log"""
+        logging.info("Soak finished: {} rounds in {:.0f}s".format(self.rounds, time.perf_counter() - self.start_time))
+        for key in sorted(self.totals):
+            logging.info('{:.<60}'.format(key) + self.totals[key].describe())
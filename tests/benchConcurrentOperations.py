@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import time
+import asyncio
+import unittest
+import uuid
+import logging
+import threading
+import concurrent.futures
+
+import benchmark
+import cache
+from pythonTestTask import base_dir_name, get_option_value
+
+# numbers of operations in flight and number of files, can be changed with "--depths" and "--operations"
+# command line arguments
+depths = [int(depth) for depth in get_option_value('--depths', '1,4,16,64').split(',')]
+operations = int(get_option_value('--operations', 2000))
+
+# content of the written files, page-aligned buffer (the cache policy can require O_DIRECT)
+block = cache.aligned_buffer(4096)
+block.write(os.urandom(len(block)))
+
+buffers = threading.local()  # page-aligned read buffer of every thread
+
+
+def create_file(path):
+    """Creates a new empty file"""
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+
+
+def write_file(path):
+    """Writes the block to the file with the cache policy (see cache module)"""
+    with open(path, mode='wb', buffering=0, opener=cache.aligned_opener) as file:
+        file.write(block)
+
+
+def read_file(path):
+    """Reads the file with the cache policy (see cache module), returns the number of read bytes"""
+    if not hasattr(buffers, 'buffer'):
+        buffers.buffer = cache.aligned_buffer(len(block))
+    with open(path, mode='rb', buffering=0, opener=cache.aligned_opener) as file:
+        return file.readinto(buffers.buffer)
+
+
+async def drive(loop, executor, depth, operation, paths):
+    """Runs the operation for every path, no more than depth operations are in flight at the same time
+
+    Returns the list of results of the operation.
+    """
+    semaphore = asyncio.Semaphore(depth)
+
+    async def run_one(path):
+        async with semaphore:
+            return await loop.run_in_executor(executor, operation, path)
+
+    return await asyncio.gather(*[run_one(path) for path in paths])
+
+
+class BenchConcurrentOperations(unittest.TestCase):
+    """Concurrent operations throughput benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(BenchConcurrentOperations.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def test_throughput_by_depth(self):
+        """TC701 Throughput by operations in flight
+
+        The benchmark measures throughput of file operations issued concurrently
+
+        Steps:
+            1. Create the number of files concurrently, keeping the given number of operations in flight
+            2. Get status of the files concurrently
+            3. Write a block to the files concurrently
+            4. Read the files concurrently
+            5. Delete the files concurrently
+            6. Check that all the files have been read completely and deleted
+            7. Repeat Steps 1-6 for every number of operations in flight
+
+        Expected results:
+            All operations are successful; throughput of every operation for every number of operations in flight
+            is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_throughput_by_depth.__doc__.split('\n', 1)[0]))
+
+        phases = [("create", create_file), ("stat", os.stat), ("write", write_file), ("read", read_file),
+                  ("unlink", os.unlink)]
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            for depth in depths:
+                folder = os.path.join(self.dirname, "depth-" + str(depth))
+                os.mkdir(folder)
+                paths = [os.path.join(folder, "file-" + str(number)) for number in range(operations)]
+
+                with concurrent.futures.ThreadPoolExecutor(max_workers=depth) as executor:
+                    for phase_name, operation in phases:
+                        # the cached pages are dropped with the cache policy, it's not measured
+                        if phase_name == "read":
+                            for path in paths:
+                                cache.before_read(path)
+                        start_time = time.perf_counter()
+                        results = loop.run_until_complete(drive(loop, executor, depth, operation, paths))
+                        elapsed = time.perf_counter() - start_time
+                        if phase_name == "write":
+                            for path in paths:
+                                cache.after_write(path)
+
+                        description = "depth={:<6}{:<8}{:>10.0f} ops/s".format(
+                            depth, phase_name, operations / elapsed)
+                        benchmark.add_result(self, description)
+                        if phase_name == "read":
+                            self.assertEqual([len(block)] * operations, results)
+
+                self.assertEqual([], os.listdir(folder))
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+import logging
+
+import benchmark
+import cache
+from pythonTestTask import base_dir_name, get_option_value
+
+# sizes used in the benchmarks, can be changed with "--block-sizes" and "--file-sizes" command line arguments
+block_sizes = benchmark.parse_sizes(get_option_value('--block-sizes', '4K,64K,1M'))
+file_sizes = benchmark.parse_sizes(get_option_value('--file-sizes', '1M,16M'))
+
+# local disk folder used as a baseline for comparison, can be changed with "--local-dir" command line argument
+local_dir_name = get_option_value('--local-dir', tempfile.gettempdir())
+
+
+def sweep():
+    """Yields (file size, block size) pairs of the benchmark; blocks larger than the file and file sizes which are
+    not a multiple of the block size (see partial_block_sizes()) are skipped"""
+    for file_size in file_sizes:
+        for block_size in block_sizes:
+            if block_size <= file_size and file_size % block_size == 0:
+                yield file_size, block_size
+
+
+def partial_block_sizes():
+    """Returns (file size, block size) pairs skipped by sweep() because the last block of the file would be partial"""
+    return [(file_size, block_size) for file_size in file_sizes for block_size in block_sizes
+            if block_size <= file_size and file_size % block_size != 0]
+
+
+def block_offsets(file_size, block_size, shuffle):
+    """Returns offsets of all blocks of the file, in sequential or in reproducible random order"""
+    offsets = list(range(0, file_size - block_size + 1, block_size))
+    if shuffle:
+        random.Random(file_size ^ block_size).shuffle(offsets)
+    return offsets
+
+
+def write_file(path, file_size, block_size, fsync=False, shuffle=False):
+    """Writes the file by blocks and returns elapsed time; the time includes fsync() and close()
+
+    The cache policy is applied (see cache module), dropping the cached pages is not measured.
+    """
+    block = cache.aligned_buffer(block_size)
+    block.write(os.urandom(block_size))
+    start_time = time.perf_counter()
+    fd = os.open(path, cache.open_flags(os.O_WRONLY | os.O_CREAT | os.O_TRUNC), 0o644)
+    try:
+        for offset in block_offsets(file_size, block_size, shuffle):
+            os.pwrite(fd, block, offset)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    elapsed = time.perf_counter() - start_time
+    cache.after_write(path)
+    return elapsed
+
+
+def read_file(path, file_size, block_size, shuffle=False):
+    """Reads the file by blocks into one buffer and returns (elapsed time, number of read bytes)
+
+    The cache policy is applied (see cache module), dropping the cached pages is not measured.
+    """
+    buffer = cache.aligned_buffer(block_size)
+    read_bytes = 0
+    cache.before_read(path)
+    start_time = time.perf_counter()
+    fd = os.open(path, cache.open_flags(os.O_RDONLY))
+    try:
+        for offset in block_offsets(file_size, block_size, shuffle):
+            os.lseek(fd, offset, os.SEEK_SET)
+            read_bytes += os.readv(fd, [buffer])
+    finally:
+        os.close(fd)
+    return time.perf_counter() - start_time, read_bytes
+
+
+class BenchDataThroughput(unittest.TestCase):
+    """Data path throughput benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        # the local folder name is generated here, so parallel workers don't share it
+        cls.local_dirname = os.path.join(local_dir_name, "test-" + str(uuid.uuid4()))
+        os.mkdir(cls.dirname)
+        os.mkdir(cls.local_dirname)
+        logging.debug("Starting test group: " + str(BenchDataThroughput.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname)
+        logging.debug("Local baseline folder " + cls.local_dirname + "\n")
+        for file_size, block_size in partial_block_sizes():
+            logging.info("Data throughput benchmarks: file size {} is not a multiple of block size {}, skipped".format(
+                benchmark.format_size(file_size), benchmark.format_size(block_size)))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+        shutil.rmtree(cls.local_dirname)
+
+    def targets(self):
+        """Returns (target name, folder) pairs: the tested folder and the local baseline folder"""
+        return [("nfs", self.dirname), ("local", self.local_dirname)]
+
+    def report(self, target, operation, file_size, block_size, elapsed):
+        """Adds MB/s and IOPS of the measurement to the benchmark results"""
+        description = "{:<6}{:<24}size={:<6}bs={:<6}{:>10.1f} MB/s{:>12.0f} IOPS".format(
+            target, operation, benchmark.format_size(file_size), benchmark.format_size(block_size),
+            file_size / elapsed / 1024 ** 2, file_size // block_size / elapsed)
+        benchmark.add_result(self, description)
+
+    def run_write_benchmark(self, operation, shuffle):
+        """Measures writing of all sizes of the sweep with and without fsync() in all targets"""
+        for target, dirname in self.targets():
+            for file_size, block_size in sweep():
+                for fsync in (False, True):
+                    filename = os.path.join(dirname, operation + "-" + str(uuid.uuid4()))
+                    elapsed = write_file(filename, file_size, block_size, fsync, shuffle)
+                    self.assertEqual(file_size, os.path.getsize(filename))
+                    self.report(target, operation + ("-fsync" if fsync else ""), file_size, block_size, elapsed)
+                    os.remove(filename)
+
+    def run_read_benchmark(self, operation, shuffle):
+        """Measures reading of all sizes of the sweep in all targets"""
+        for target, dirname in self.targets():
+            for file_size, block_size in sweep():
+                filename = os.path.join(dirname, operation + "-" + str(uuid.uuid4()))
+                write_file(filename, file_size, block_size, fsync=True)
+                elapsed, read_bytes = read_file(filename, file_size, block_size, shuffle)
+                self.assertEqual(file_size, read_bytes)
+                self.report(target, operation, file_size, block_size, elapsed)
+                os.remove(filename)
+
+    def test_sequential_write(self):
+        """TC301 Sequential write throughput
+
+        The benchmark measures throughput of sequential writing to a file
+
+        Steps:
+            1. For every file size, block size and fsync variant write a new file block by block in sequential order
+            2. Check the size of the written file
+            3. Repeat Steps 1-2 in the local baseline folder
+
+        Expected results:
+            Sizes of the written files are equal to the requested sizes; MB/s and IOPS are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_sequential_write.__doc__.split('\n', 1)[0]))
+        self.run_write_benchmark("seq-write", shuffle=False)
+
+    def test_sequential_read(self):
+        """TC302 Sequential read throughput
+
+        The benchmark measures throughput of sequential reading from a file
+
+        Steps:
+            1. For every file size and block size create a file
+            2. Read the file block by block in sequential order
+            3. Check the number of read bytes
+            4. Repeat Steps 1-3 in the local baseline folder
+
+        Expected results:
+            Numbers of read bytes are equal to the file sizes; MB/s and IOPS are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_sequential_read.__doc__.split('\n', 1)[0]))
+        self.run_read_benchmark("seq-read", shuffle=False)
+
+    def test_random_write(self):
+        """TC303 Random write throughput
+
+        The benchmark measures throughput of writing to a file in random order of blocks
+
+        Steps:
+            1. For every file size, block size and fsync variant write a new file block by block in random order
+            2. Check the size of the written file
+            3. Repeat Steps 1-2 in the local baseline folder
+
+        Expected results:
+            Sizes of the written files are equal to the requested sizes; MB/s and IOPS are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_random_write.__doc__.split('\n', 1)[0]))
+        self.run_write_benchmark("rand-write", shuffle=True)
+
+    def test_random_read(self):
+        """TC304 Random read throughput
+
+        The benchmark measures throughput of reading from a file in random order of blocks
+
+        Steps:
+            1. For every file size and block size create a file
+            2. Read the file block by block in random order
+            3. Check the number of read bytes
+            4. Repeat Steps 1-3 in the local baseline folder
+
+        Expected results:
+            Numbers of read bytes are equal to the file sizes; MB/s and IOPS are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_random_read.__doc__.split('\n', 1)[0]))
+        self.run_read_benchmark("rand-read", shuffle=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
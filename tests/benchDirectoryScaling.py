@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import resource
+import shutil
+import time
+import unittest
+import uuid
+import logging
+
+import benchmark
+from pythonTestTask import base_dir_name, get_option_value
+
+# numbers of entries the directory is filled to, can be changed with "--dir-sizes" command line argument
+dir_sizes = sorted(int(size) for size in get_option_value('--dir-sizes', '1000,10000,100000').split(','))
+
+lookups = 1000  # number of lookups measured at every directory size
+
+
+def entry_name(number):
+    """Returns the name of the directory entry with the number"""
+    return "entry-{:08d}".format(number)
+
+
+def create_entries(folder, first, last):
+    """Creates empty files with the numbers from first to last (not including) in the folder"""
+    for number in range(first, last):
+        os.close(os.open(os.path.join(folder, entry_name(number)), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on Linux
+
+
+def scan(folder):
+    """Streams the folder with os.scandir() without keeping the entries
+
+    Returns the time to the first entry, the time to the full listing and the number of entries.
+    """
+    count = 0
+    first_entry_time = None
+    start_time = time.perf_counter()
+    entries = os.scandir(folder)
+    try:
+        for entry in entries:
+            if first_entry_time is None:
+                first_entry_time = time.perf_counter() - start_time
+            if entry.is_file(follow_symlinks=False):
+                count += 1
+    finally:
+        if hasattr(entries, 'close'):  # the iterator can be closed since Python 3.6
+            entries.close()
+    return first_entry_time, time.perf_counter() - start_time, count
+
+
+class BenchDirectoryScaling(unittest.TestCase):
+    """Large directory scaling benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(BenchDirectoryScaling.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def test_growing_directory(self):
+        """TC901 Create, list and look up in a growing directory
+
+        The benchmark measures how directory operations scale with the number of entries
+
+        Steps:
+            1. Create empty files in a folder until it contains the number of entries, measure the creation rate
+            2. Stream the folder with os.scandir(), measure the time to the first entry and to the full listing
+            3. Get status of random existing entries and of not existing names, measure the latency
+            4. Repeat Steps 1-3 for every number of entries, the folder is filled further each time
+
+        Expected results:
+            The listing contains every created entry; creation rate, listing times, lookup latencies and peak
+            resident set size of the process for every number of entries are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_growing_directory.__doc__.split('\n', 1)[0]))
+
+        folder = os.path.join(self.dirname, "growing")
+        os.mkdir(folder)
+        created = 0
+        for size in dir_sizes:
+            start_time = time.perf_counter()
+            create_entries(folder, created, size)
+            create_time = time.perf_counter() - start_time
+            create_rate = (size - created) / create_time if size > created else 0.0
+            created = max(created, size)
+
+            first_entry_time, listing_time, count = scan(folder)
+
+            existing = benchmark.Histogram()
+            missing = benchmark.Histogram()
+            for number in random.sample(range(created), min(lookups, created)):
+                start_time = time.perf_counter()
+                os.stat(os.path.join(folder, entry_name(number)))
+                existing.add(time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                try:
+                    os.stat(os.path.join(folder, "missing-" + str(number)))
+                except FileNotFoundError:
+                    pass
+                missing.add(time.perf_counter() - start_time)
+
+            benchmark.add_result(self, "entries={:<8}create {:>8.0f} ops/s  first entry {:.3f} ms  listing {:.3f} s  "
+                                       "lookup p50={:.3f}ms p99={:.3f}ms  missing p50={:.3f}ms p99={:.3f}ms  "
+                                       "peak RSS {:.1f} MB".format(
+                created, create_rate, (first_entry_time or 0.0) * 1000, listing_time,
+                existing.percentile(50) * 1000, existing.percentile(99) * 1000,
+                missing.percentile(50) * 1000, missing.percentile(99) * 1000, peak_rss()))
+            self.assertEqual(created, count)
+
+    def test_shrinking_directory(self):
+        """TC902 Delete from a large directory
+
+        The benchmark measures how deleting entries scales with the number of entries in the directory
+
+        Steps:
+            1. Create empty files in a folder until it contains the largest number of entries
+            2. Delete random entries until the folder contains the next smaller number of entries,
+               measure the deletion rate
+            3. Stream the folder with os.scandir() and count the entries
+            4. Repeat Steps 2-3 for every number of entries down to an empty folder
+
+        Expected results:
+            The folder contains the expected number of entries after every step; deletion rate for every
+            number of entries is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_shrinking_directory.__doc__.split('\n', 1)[0]))
+
+        folder = os.path.join(self.dirname, "shrinking")
+        os.mkdir(folder)
+        create_entries(folder, 0, dir_sizes[-1])
+        numbers = list(range(dir_sizes[-1]))
+        random.shuffle(numbers)
+
+        for size in reversed([0] + dir_sizes[:-1]):
+            count = len(numbers) - size
+            start_time = time.perf_counter()
+            for number in numbers[size:]:
+                os.unlink(os.path.join(folder, entry_name(number)))
+            unlink_time = time.perf_counter() - start_time
+            entries_before = len(numbers)
+            del numbers[size:]
+
+            benchmark.add_result(self, "entries={:<8}unlink {:>8.0f} ops/s  ({} -> {} entries)".format(
+                entries_before, count / unlink_time if count else 0.0, entries_before, size))
+            self.assertEqual(size, scan(folder)[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
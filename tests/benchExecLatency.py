@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import math
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+import statistics
+import uuid
+import logging
+
+import benchmark
+import cache
+from pythonTestTask import base_dir_name, get_option_value
+
+# programs copied to the tested folder and run with "--version", names are searched in PATH,
+# can be changed with "--exec-binaries" command line argument (e.g. larger binaries "--exec-binaries ls,/usr/bin/gdb")
+binaries = [shutil.which(name) or name for name in get_option_value('--exec-binaries', 'true,ls').split(',')]
+
+# number of runs in every cache state, can be changed with "--exec-iterations" command line argument
+iterations = int(get_option_value('--exec-iterations', 20))
+
+# shell command evicting the files from the client cache instead of posix_fadvise() (e.g. remounting the tested
+# folder), can be set with "--evict-command" command line argument
+evict_command = get_option_value('--evict-command')
+
+# local disk folder used as a baseline for comparison, can be changed with "--local-dir" command line argument
+local_dir_name = get_option_value('--local-dir', tempfile.gettempdir())
+
+script = "#!/bin/sh\n" + "# padding of the script\n" * 200 + "exit 0\n"
+
+
+def evict(path):
+    """Drops the cached pages of the file: runs the evict command or asks the kernel with posix_fadvise()"""
+    if evict_command is not None:
+        subprocess.run(evict_command, shell=True, check=True)
+        return
+    cache.drop(path)
+
+
+def percentile(times, percent):
+    """Returns the percentile of the times by the nearest-rank method"""
+    ordered = sorted(times)
+    return ordered[max(0, int(math.ceil(percent / 100.0 * len(ordered))) - 1)]
+
+
+def measure(command, cold_path=None):
+    """Runs the command the number of iterations times, returns the list of execve-to-exit times (seconds)
+
+    If cold_path is set, the file is evicted from the cache before every run (the eviction is not measured),
+    otherwise the command is run once before the measurement to warm the cache up.
+    """
+    times = []
+    if cold_path is None:
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    for _ in range(iterations):
+        if cold_path is not None:
+            evict(cold_path)
+        start_time = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start_time)
+    return times
+
+
+class BenchExecLatency(unittest.TestCase):
+    """Program execution benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        # the local folder name is generated here, so parallel workers don't share it
+        cls.local_dirname = os.path.join(local_dir_name, "test-" + str(uuid.uuid4()))
+        os.mkdir(cls.dirname)
+        os.mkdir(cls.local_dirname)
+        logging.debug("Starting test group: " + str(BenchExecLatency.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname)
+        logging.debug("Local baseline folder " + cls.local_dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+        shutil.rmtree(cls.local_dirname)
+
+    def report(self, name, size, cold, warm, local):
+        """Adds the cold, warm and local times of the program and the costs derived from them to the results
+
+        The local time is the cost of process startup, page-in is the cold time minus the warm time, revalidation
+        is the warm time minus the local time (looking up and checking the attributes of the file on the server);
+        the costs are the differences of the exact medians of the raw times.
+        """
+        cold_median, warm_median, local_median = (statistics.median(times) for times in (cold, warm, local))
+        description = ("{:<12}size={:<7}cold p50={:.3f}ms p95={:.3f}ms  warm p50={:.3f}ms p95={:.3f}ms  "
+                       "local p50={:.3f}ms  page-in {:+.3f}ms  revalidation {:+.3f}ms").format(
+            name, benchmark.format_size(size), cold_median * 1000, percentile(cold, 95) * 1000,
+            warm_median * 1000, percentile(warm, 95) * 1000, local_median * 1000,
+            (cold_median - warm_median) * 1000, (warm_median - local_median) * 1000)
+        benchmark.add_result(self, description)
+
+    def measure_program(self, name, write_program, arguments):
+        """Writes the program to the tested and the local folder with write_program(path), measures and reports
+        its cold, warm and local execution times"""
+        path = os.path.join(self.dirname, name + "-" + str(uuid.uuid4()))
+        local_path = os.path.join(self.local_dirname, os.path.basename(path))
+        for target in (path, local_path):
+            write_program(target)
+            os.chmod(target, 0o700)
+        cold = measure([path] + arguments, cold_path=path)
+        warm = measure([path] + arguments)
+        local = measure([local_path] + arguments)
+        self.report(name, os.stat(path).st_size, cold, warm, local)
+
+    def test_exec_script(self):
+        """TC931 Run a script from the folder, cold and warm cache
+
+        The benchmark measures the time from starting a shell script stored in the tested folder to its exit
+
+        Steps:
+            1. Write an executable shell script to the tested folder and to the local baseline folder
+            2. Drop the cached pages of the script, run it and wait for the exit, measure the time; repeat
+            3. Run the script with the warm cache, measure the time; repeat
+            4. Run the script from the local baseline folder, measure the time; repeat
+
+        Expected results:
+            The script exits with code 0 every time; the median and the 95th percentile of the times and
+            the costs of page-in (Step 2 minus Step 3) and revalidation (Step 3 minus Step 4) are written to the log,
+            the local time (Step 4) is the cost of process startup
+        """
+        logging.debug("Starting test: " + str(self.test_exec_script.__doc__.split('\n', 1)[0]))
+
+        def write_script(path):
+            with open(path, mode='w') as file:
+                file.write(script)
+        self.measure_program("script", write_script, [])
+
+    def test_exec_binaries(self):
+        """TC932 Run programs from the folder, cold and warm cache
+
+        The benchmark measures the time from starting a binary program stored in the tested folder to its exit
+
+        Steps:
+            1. Copy the program to the tested folder and to the local baseline folder
+            2. Drop the cached pages of the program, run it with "--version" and wait for the exit, measure
+               the time; repeat
+            3. Run the program with the warm cache, measure the time; repeat
+            4. Run the program from the local baseline folder, measure the time; repeat
+            5. Repeat Steps 1-4 for every program
+
+        Expected results:
+            The programs exit with code 0 every time; the median and the 95th percentile of the times and
+            the costs of page-in (Step 2 minus Step 3) and revalidation (Step 3 minus Step 4) are written to the log,
+            the local time (Step 4) is the cost of process startup
+        """
+        logging.debug("Starting test: " + str(self.test_exec_binaries.__doc__.split('\n', 1)[0]))
+
+        for binary in binaries:
+            self.measure_program(os.path.basename(binary), lambda path: shutil.copyfile(binary, path), ["--version"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import mmap
+import shutil
+import time
+import unittest
+import uuid
+import logging
+
+import benchmark
+import cache
+from pythonTestTask import base_dir_name, get_option_value
+
+# size of the files, can be changed with "--large-file-size" command line argument
+file_size = benchmark.parse_size(get_option_value('--large-file-size', '64M'))
+
+# the payload is the pattern block repeated; it's written and verified through memoryview slices without copying
+pattern = memoryview(os.urandom(1024 ** 2))
+
+
+def chunks(size):
+    """Yields (offset, length) of the pattern-sized chunks of the file"""
+    for offset in range(0, size, len(pattern)):
+        yield offset, min(len(pattern), size - offset)
+
+
+def write_pattern(path, size):
+    """Writes the file of the size with the pattern; the cached pages are dropped with the cache policy"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for offset, length in chunks(size):
+            os.write(fd, pattern[:length])
+    finally:
+        os.close(fd)
+    cache.after_write(path, unaligned=True)
+
+
+def find_mismatch(path, size):
+    """Reads the file by chunks and compares them with the pattern
+
+    Returns the offset of the first chunk different from the pattern or None if the file content is correct.
+    The file is read with the cache policy (see cache module) into an aligned buffer.
+    """
+    buffer = cache.aligned_buffer(len(pattern))
+    view = memoryview(buffer)
+    cache.before_read(path)
+    # the whole buffer is read every time, O_DIRECT requires aligned lengths (the last chunk is a short read)
+    with open(path, mode='rb', buffering=0, opener=cache.aligned_opener) as file:
+        for offset, length in chunks(size):
+            if file.readinto(view) != length or view[:length] != pattern[:length]:
+                return offset
+        if file.readinto(view):
+            return size
+    return None
+
+
+def copy_with_copy_file_range(source_fd, target_fd, size):
+    """Copies the file with copy_file_range() (server-side copy on NFSv4.2)"""
+    copied = 0
+    while copied < size:
+        length = os.copy_file_range(source_fd, target_fd, size - copied)
+        if length == 0:
+            break
+        copied += length
+
+
+def copy_with_sendfile(source_fd, target_fd, size):
+    """Copies the file with sendfile()"""
+    copied = 0
+    while copied < size:
+        length = os.sendfile(target_fd, source_fd, copied, size - copied)
+        if length == 0:
+            break
+        copied += length
+
+
+def copy_with_read_write(source_fd, target_fd, size):
+    """Copies the file with a user-space loop of read() and write() through one buffer"""
+    buffer = bytearray(len(pattern))
+    view = memoryview(buffer)
+    while True:
+        length = os.readv(source_fd, [buffer])
+        if length == 0:
+            break
+        written = 0
+        while written < length:
+            written += os.write(target_fd, view[written:length])
+
+
+class BenchMappedCopy(unittest.TestCase):
+    """Memory-mapped I/O and file copy benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(BenchMappedCopy.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def test_mmap_write(self):
+        """TC801 Memory-mapped write throughput and msync cost
+
+        The benchmark measures writing to a memory-mapped file and synchronizing the mapping with msync()
+
+        Steps:
+            1. Create a file of the size and map it to memory
+            2. Write the pattern to the mapping, measure the time
+            3. Synchronize the mapping with msync(), measure the time
+            4. Unmap and close the file
+            5. Read the file and compare it with the pattern
+
+        Expected results:
+            The file content is equal to the pattern; MB/s of writing and msync() time are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_mmap_write.__doc__.split('\n', 1)[0]))
+
+        filename = os.path.join(self.dirname, "mmap_write-" + str(uuid.uuid4()))
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.ftruncate(fd, file_size)
+            mapped = mmap.mmap(fd, file_size)
+            view = memoryview(mapped)
+            try:
+                start_time = time.perf_counter()
+                for offset, length in chunks(file_size):
+                    view[offset:offset + length] = pattern[:length]
+                write_time = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                mapped.flush()
+                msync_time = time.perf_counter() - start_time
+            finally:
+                view.release()
+                mapped.close()
+        finally:
+            os.close(fd)
+
+        benchmark.add_result(self, "mmap-write  size={:<6}{:>10.1f} MB/s  msync {:.3f} ms".format(
+            benchmark.format_size(file_size), file_size / write_time / 1024 ** 2, msync_time * 1000))
+        self.assertIsNone(find_mismatch(filename, file_size), "The file content differs from the pattern")
+
+    def test_mmap_read(self):
+        """TC802 Memory-mapped read throughput
+
+        The benchmark measures reading of a memory-mapped file
+
+        Steps:
+            1. Create a file of the size containing the pattern
+            2. Map the file to memory and compare the mapping with the pattern chunk by chunk, measure the time
+
+        Expected results:
+            The mapping is equal to the pattern; MB/s of reading is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_mmap_read.__doc__.split('\n', 1)[0]))
+
+        filename = os.path.join(self.dirname, "mmap_read-" + str(uuid.uuid4()))
+        write_pattern(filename, file_size)
+        cache.before_read(filename, unaligned=True)
+
+        mismatches = []
+        with open(filename, mode='rb') as file:
+            mapped = mmap.mmap(file.fileno(), file_size, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                start_time = time.perf_counter()
+                for offset, length in chunks(file_size):
+                    if view[offset:offset + length] != pattern[:length]:
+                        mismatches.append(offset)
+                read_time = time.perf_counter() - start_time
+            finally:
+                view.release()
+                mapped.close()
+
+        benchmark.add_result(self, "mmap-read   size={:<6}{:>10.1f} MB/s".format(
+            benchmark.format_size(file_size), file_size / read_time / 1024 ** 2))
+        self.assertEqual([], mismatches)
+
+    def test_mmap_coherence(self):
+        """TC803 Memory-mapped I/O coherence after close and reopen
+
+        The test verifies that changes made through a mapping are visible to reading after reopening the file
+        and changes made by writing are visible through a new mapping
+
+        Steps:
+            1. Create a file of the size, map it to memory and write the pattern to the mapping
+            2. Unmap and close the file without msync()
+            3. Reopen the file and read it
+            4. Overwrite the first chunk of the file with write() and close the file
+            5. Reopen and map the file, read the first chunk through the mapping
+
+        Expected results:
+            1. The content read in Step 3 is equal to the pattern
+            2. The chunk read in Step 5 is equal to the data written in Step 4
+        """
+        logging.debug("Starting test: " + str(self.test_mmap_coherence.__doc__.split('\n', 1)[0]))
+
+        filename = os.path.join(self.dirname, "mmap_coherence-" + str(uuid.uuid4()))
+        with open(filename, mode='w+b') as file:
+            file.truncate(file_size)
+            mapped = mmap.mmap(file.fileno(), file_size)
+            view = memoryview(mapped)
+            for offset, length in chunks(file_size):
+                view[offset:offset + length] = pattern[:length]
+            view.release()
+            mapped.close()
+
+        self.assertIsNone(find_mismatch(filename, file_size), "Changes of the mapping are not visible")
+
+        chunk = os.urandom(min(len(pattern), file_size))
+        with open(filename, mode='r+b') as file:
+            file.write(chunk)
+
+        with open(filename, mode='rb') as file:
+            mapped = mmap.mmap(file.fileno(), file_size, access=mmap.ACCESS_READ)
+            try:
+                self.assertEqual(chunk, mapped[:len(chunk)], "Written data is not visible through the mapping")
+            finally:
+                mapped.close()
+
+    def test_copy(self):
+        """TC804 File copy methods throughput
+
+        The benchmark compares copying a file with copy_file_range() (server-side COPY on NFSv4.2), sendfile()
+        and a user-space read/write loop
+
+        Steps:
+            1. Create a file of the size containing the pattern
+            2. Copy the file to a new file with every method, measure the time and the client CPU time
+            3. Compare every copy with the pattern
+
+        Expected results:
+            Every copy is equal to the pattern; MB/s and CPU time of every method are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_copy.__doc__.split('\n', 1)[0]))
+
+        source = os.path.join(self.dirname, "copy_source-" + str(uuid.uuid4()))
+        write_pattern(source, file_size)
+
+        methods = [("read-write", copy_with_read_write), ("sendfile", copy_with_sendfile)]
+        if hasattr(os, 'copy_file_range'):  # Python 3.8+
+            methods.insert(0, ("copy_file_range", copy_with_copy_file_range))
+        else:
+            logging.debug("os.copy_file_range() is not available")
+
+        for method_name, copy in methods:
+            target = os.path.join(self.dirname, "copy_" + method_name + "-" + str(uuid.uuid4()))
+            source_fd = os.open(source, os.O_RDONLY)
+            target_fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                start_time = time.perf_counter()
+                start_cpu_time = time.process_time()
+                copy(source_fd, target_fd, file_size)
+                os.fsync(target_fd)
+                cpu_time = time.process_time() - start_cpu_time
+                elapsed = time.perf_counter() - start_time
+            finally:
+                os.close(source_fd)
+                os.close(target_fd)
+
+            benchmark.add_result(self, "{:<16}size={:<6}{:>10.1f} MB/s  cpu {:.3f} ms".format(
+                method_name, benchmark.format_size(file_size), file_size / elapsed / 1024 ** 2, cpu_time * 1000))
+            self.assertIsNone(find_mismatch(target, file_size), "The copy made with " + method_name + " differs")
+            os.remove(target)
+
+
+if __name__ == '__main__':
+    unittest.main()
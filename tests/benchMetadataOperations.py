@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+import time
+import unittest
+import uuid
+import logging
+
+import backends
+import benchmark
+from pythonTestTask import base_dir_name, get_option_value
+
+# number of repetitions of every operation, can be changed with "--iterations" command line argument
+iterations = int(get_option_value('--iterations', 1000))
+
+
+def create_file(path):
+    """Creates a new empty file, the file must not exist"""
+    backends.current.open_flags(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644).close()
+
+
+class BenchMetadataOperations(unittest.TestCase):
+    """Metadata operations latency benchmarks"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fs = backends.current  # file system backend of the benchmarks
+        cls.fs.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(BenchMetadataOperations.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fs.rmtree(cls.dirname)
+
+    def make_folder(self, prefix):
+        """Creates a new folder for the benchmark files and returns its path"""
+        folder = os.path.join(self.dirname, prefix + "-" + str(uuid.uuid4()))
+        self.fs.mkdir(folder)
+        logging.debug("Benchmark folder: " + folder)
+        return folder
+
+    def make_files(self, folder):
+        """Creates files for the benchmark (the creation is not measured) and returns their paths"""
+        paths = [os.path.join(folder, "file-" + str(number)) for number in range(iterations)]
+        for path in paths:
+            create_file(path)
+        return paths
+
+    def measure(self, operation_name, operation, arguments_list):
+        """Runs the operation once for every arguments tuple, adds the latency histogram to the benchmark results"""
+        histogram = benchmark.Histogram()
+        for arguments in arguments_list:
+            start_time = time.perf_counter()
+            operation(*arguments)
+            histogram.add(time.perf_counter() - start_time)
+
+        description = "{:<8}".format(operation_name) + histogram.describe()
+        benchmark.add_result(self, description)
+
+    def test_create_latency(self):
+        """TC401 Create a file latency
+
+        The benchmark measures latency of exclusive creating of a new file
+
+        Steps:
+            1. Create the number of files with open(O_CREAT|O_EXCL) and close(), measure every creation
+            2. Check the number of files in the folder
+
+        Expected results:
+            All files are created; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_create_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("create")
+        self.measure("create", create_file,
+                     [(os.path.join(folder, "file-" + str(number)),) for number in range(iterations)])
+        self.assertEqual(iterations, len(self.fs.listdir(folder)))
+
+    def test_unlink_latency(self):
+        """TC402 Delete a file latency
+
+        The benchmark measures latency of deleting a file
+
+        Steps:
+            1. Create the number of files
+            2. Delete the files from Step 1, measure every deletion
+            3. Check that the folder is empty
+
+        Expected results:
+            All files are deleted; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_unlink_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("unlink")
+        self.measure("unlink", self.fs.remove, [(path,) for path in self.make_files(folder)])
+        self.assertEqual([], self.fs.listdir(folder))
+
+    def test_rename_latency(self):
+        """TC403 Rename a file latency
+
+        The benchmark measures latency of renaming a file
+
+        Steps:
+            1. Create the number of files
+            2. Rename the files from Step 1, measure every renaming
+            3. Check that all the files have the new names
+
+        Expected results:
+            All files are renamed; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_rename_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("rename")
+        self.measure("rename", self.fs.rename, [(path, path + "-renamed") for path in self.make_files(folder)])
+        self.assertTrue(all(name.endswith("-renamed") for name in self.fs.listdir(folder)))
+        self.assertEqual(iterations, len(self.fs.listdir(folder)))
+
+    def test_stat_latency(self):
+        """TC404 Get file status latency
+
+        The benchmark measures latency of getting a file status with stat()
+
+        Steps:
+            1. Create the number of files
+            2. Get status of the files from Step 1, measure every stat() call
+
+        Expected results:
+            No exceptions are risen; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_stat_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("stat")
+        self.measure("stat", self.fs.stat, [(path,) for path in self.make_files(folder)])
+
+    def test_chmod_latency(self):
+        """TC405 Change file permissions latency
+
+        The benchmark measures latency of changing file permissions
+
+        Steps:
+            1. Create the number of files
+            2. Change permissions of the files from Step 1 to read-only for the owner, measure every chmod() call
+            3. Check permissions of the files
+
+        Expected results:
+            Permissions of all files are changed; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_chmod_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("chmod")
+        paths = self.make_files(folder)
+        self.measure("chmod", self.fs.chmod, [(path, stat.S_IRUSR) for path in paths])
+        for path in paths:
+            self.assertEqual(stat.S_IRUSR, stat.S_IMODE(self.fs.stat(path).st_mode))
+
+    def test_mkdir_rmdir_latency(self):
+        """TC406 Create and delete a folder latency
+
+        The benchmark measures latency of creating and deleting a folder
+
+        Steps:
+            1. Create the number of folders, measure every creation
+            2. Delete the folders from Step 1, measure every deletion
+            3. Check that the parent folder is empty
+
+        Expected results:
+            All folders are created and deleted; operations per second and latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_mkdir_rmdir_latency.__doc__.split('\n', 1)[0]))
+
+        folder = self.make_folder("mkdir")
+        paths = [(os.path.join(folder, "folder-" + str(number)),) for number in range(iterations)]
+        self.measure("mkdir", self.fs.mkdir, paths)
+        self.assertEqual(iterations, len(self.fs.listdir(folder)))
+        self.measure("rmdir", self.fs.rmdir, paths)
+        self.assertEqual([], self.fs.listdir(folder))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import fcntl
+import shutil
+import struct
+import time
+import unittest
+import uuid
+import logging
+import multiprocessing
+
+import benchmark
+from pythonTestTask import base_dir_name, get_option_value
+
+# maximal number of contending processes and number of operations of every process,
+# can be changed with "--stress-workers" and "--stress-iterations" command line arguments
+max_workers = int(get_option_value('--stress-workers', 4))
+iterations = int(get_option_value('--stress-iterations', 200))
+
+record_length = 32  # length of a record written by a worker
+
+
+def worker_counts():
+    """Returns the numbers of workers for the scaling measurements: powers of two up to the maximal number"""
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    return counts + [max_workers] if max_workers > 1 else counts
+
+
+def make_record(worker, number):
+    """Returns the record of the worker: fixed length line, which identifies the worker and the operation"""
+    return "{:>8}:{:>8}:".format(worker, number).ljust(record_length - 1, '#').encode() + b'\n'
+
+
+def worker_main(queue, barrier, function, worker, arguments):
+    """Waits for all workers, runs the function and puts (worker, result, error) to the queue"""
+    try:
+        barrier.wait()
+        queue.put((worker, function(worker, *arguments), None))
+    except Exception as error:
+        queue.put((worker, None, repr(error)))
+
+
+def run_workers(function, count, *arguments):
+    """Runs the function in the number of processes started at the same time
+
+    Returns the list of results of the function and the wall time of the run.
+    """
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(count + 1)
+    queue = context.Queue()
+    processes = [context.Process(target=worker_main, args=(queue, barrier, function, worker, arguments))
+                 for worker in range(count)]
+    for process in processes:
+        process.start()
+
+    barrier.wait()  # all workers are started
+    start_time = time.perf_counter()
+    outcomes = [queue.get() for _ in processes]
+    elapsed = time.perf_counter() - start_time
+    for process in processes:
+        process.join()
+
+    errors = [error for worker, result, error in outcomes if error is not None]
+    if errors:
+        raise RuntimeError("Worker failed: " + "; ".join(errors))
+    return [result for worker, result, error in sorted(outcomes, key=lambda outcome: outcome[0])], elapsed
+
+
+def increment_under_lock(worker, path):
+    """Increments the counter in the beginning of the file under the byte-range lock
+
+    Returns the histogram of lock acquiring latencies.
+    """
+    histogram = benchmark.Histogram()
+    fd = os.open(path, os.O_RDWR)
+    try:
+        for _ in range(iterations):
+            start_time = time.perf_counter()
+            fcntl.lockf(fd, fcntl.LOCK_EX, 8, 0)
+            histogram.add(time.perf_counter() - start_time)
+            (counter,) = struct.unpack('>Q', os.pread(fd, 8, 0))
+            os.pwrite(fd, struct.pack('>Q', counter + 1), 0)
+            fcntl.lockf(fd, fcntl.LOCK_UN, 8, 0)
+    finally:
+        os.close(fd)
+    return histogram
+
+
+def append_records(worker, path):
+    """Appends the records of the worker to the file opened with O_APPEND"""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        for number in range(iterations):
+            os.write(fd, make_record(worker, number))
+    finally:
+        os.close(fd)
+
+
+def rename_over_target(worker, path):
+    """Writes the records of the worker to a temporary file and renames it over the target
+
+    Returns the list of invalid contents of the target read by the worker after every renaming.
+    """
+    invalid_contents = []
+    for number in range(iterations):
+        temporary_path = path + "-" + str(worker)
+        with open(temporary_path, mode='wb') as file:
+            file.write(make_record(worker, number))
+        os.rename(temporary_path, path)
+        with open(path, mode='rb') as file:
+            content = file.read()
+        if len(content) != record_length or not content.endswith(b'#\n'):
+            invalid_contents.append(content)
+    return invalid_contents
+
+
+class StressConcurrentAccess(unittest.TestCase):
+    """Concurrent access stress tests"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(StressConcurrentAccess.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def test_byte_range_lock_contention(self):
+        """TC601 Byte-range lock contention
+
+        The test verifies that byte-range locks serialize updates of a file by several processes
+        and measures lock acquiring latency
+
+        Steps:
+            1. Create a file containing a zero counter
+            2. Start the number of processes, every process increments the counter the number of times;
+               the counter is read and written under the exclusive fcntl lock of its byte range
+            3. Read the counter
+            4. Repeat Steps 1-3 for the increasing number of processes
+
+        Expected results:
+            The counter from Step 3 is equal to the total number of increments (no updates are lost);
+            throughput and lock acquiring latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_byte_range_lock_contention.__doc__.split('\n', 1)[0]))
+
+        for count in worker_counts():
+            filename = os.path.join(self.dirname, "lock_file-" + str(uuid.uuid4()))
+            with open(filename, mode='wb') as file:
+                file.write(struct.pack('>Q', 0))
+
+            histograms, elapsed = run_workers(increment_under_lock, count, filename)
+            histogram = histograms[0]
+            for worker_histogram in histograms[1:]:
+                histogram.merge(worker_histogram)
+
+            with open(filename, mode='rb') as file:
+                (counter,) = struct.unpack('>Q', file.read(8))
+            logging.debug("Workers: {}, counter: {}".format(count, counter))
+            benchmark.add_result(self, "lock    workers={:<4}{:>10.0f} ops/s  acquire p50={:.3f}ms p95={:.3f}ms "
+                                       "p99={:.3f}ms max={:.3f}ms".format(
+                count, count * iterations / elapsed, histogram.percentile(50) * 1000, histogram.percentile(95) * 1000,
+                histogram.percentile(99) * 1000, histogram.maximum * 1000))
+            self.assertEqual(count * iterations, counter, "Lost updates under the lock")
+
+    def test_append_contention(self):
+        """TC602 Concurrent appending to a file
+
+        The test verifies that records appended to a file by several processes are not lost or interleaved
+
+        Steps:
+            1. Create an empty file
+            2. Start the number of processes, every process appends the number of fixed length records
+               to the file opened with O_APPEND
+            3. Read the file and split it into records
+            4. Repeat Steps 1-3 for the increasing number of processes
+
+        Expected results:
+            The file from Step 3 contains every written record exactly once, each record is intact;
+            throughput is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_append_contention.__doc__.split('\n', 1)[0]))
+
+        for count in worker_counts():
+            filename = os.path.join(self.dirname, "append_file-" + str(uuid.uuid4()))
+            open(filename, mode='x').close()
+
+            results, elapsed = run_workers(append_records, count, filename)
+
+            with open(filename, mode='rb') as file:
+                content = file.read()
+            records = [content[offset:offset + record_length] for offset in range(0, len(content), record_length)]
+            expected_records = {make_record(worker, number) for worker in range(count) for number in range(iterations)}
+            lost_records = len(expected_records - set(records))
+            interleaved_records = len([record for record in records if record not in expected_records])
+            logging.debug("Workers: {}, lost records: {}, interleaved records: {}".format(
+                count, lost_records, interleaved_records))
+            benchmark.add_result(self, "append  workers={:<4}{:>10.0f} ops/s  lost={} interleaved={}".format(
+                count, count * iterations / elapsed, lost_records, interleaved_records))
+            self.assertEqual(len(expected_records) * record_length, len(content))
+            self.assertEqual(0, lost_records, "Lost records")
+            self.assertEqual(0, interleaved_records, "Interleaved records")
+
+    def test_rename_over_target_contention(self):
+        """TC603 Concurrent renaming over a file
+
+        The test verifies that a file replaced by renaming by several processes always has a complete content
+
+        Steps:
+            1. Start the number of processes, every process writes a record to its own temporary file,
+               renames it over the common target file and reads the target file; it's repeated the number of times
+            2. Repeat Step 1 for the increasing number of processes
+
+        Expected results:
+            Every read content of the target file is a complete record; throughput is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_rename_over_target_contention.__doc__.split('\n', 1)[0]))
+
+        for count in worker_counts():
+            filename = os.path.join(self.dirname, "rename_target-" + str(uuid.uuid4()))
+
+            results, elapsed = run_workers(rename_over_target, count, filename)
+
+            invalid_contents = [content for worker_contents in results for content in worker_contents]
+            logging.debug("Workers: {}, invalid contents: {}".format(count, invalid_contents[:10]))
+            benchmark.add_result(self, "rename  workers={:<4}{:>10.0f} ops/s  invalid={}".format(
+                count, count * iterations / elapsed, len(invalid_contents)))
+            self.assertEqual([], invalid_contents, "Incomplete content of the target file")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Cache coherence between two clients
+
+The same export is mounted twice; every mount is a separate NFS client with its own attribute, data and lookup
+caches. A change is made through the first mount (the testing folder) and the second mount ("--second-mount PATH",
+the folder of the second mount which is the same folder of the export as the testing folder) is polled until
+the change is visible. The visibility latency shows the real cost of "actimeo", "noac" and "lookupcache" settings.
+"""
+
+import os
+import shutil
+import time
+import unittest
+import uuid
+import logging
+
+import benchmark
+import nfs4acl
+from pythonTestTask import base_dir_name, get_option_value
+
+# the folder of the second mount, the number of measured changes and the time to wait for every change (seconds),
+# can be changed with "--second-mount", "--coherence-iterations" and "--coherence-timeout" command line arguments
+second_mount = get_option_value('--second-mount')
+iterations = int(get_option_value('--coherence-iterations', 10))
+timeout = float(get_option_value('--coherence-timeout', 90))
+
+poll_interval = 0.001  # pause between checks of the second mount (seconds)
+
+
+def wait_visible(check):
+    """Calls the check until it returns True or the timeout expires
+
+    Returns the time (seconds) until the check returned True or None if it didn't and the number of failed checks.
+    """
+    start_time = time.perf_counter()
+    polls = 0
+    while not check():
+        polls += 1
+        if time.perf_counter() - start_time > timeout:
+            return None, polls
+        time.sleep(poll_interval)
+    return time.perf_counter() - start_time, polls
+
+
+def read_file(path):
+    """Opens the file, reads and closes it, returns the content"""
+    with open(path, mode='r') as file:
+        return file.read()
+
+
+class TestClientCoherence(unittest.TestCase):
+    """Two clients cache coherence tests"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(TestClientCoherence.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+        if second_mount is None:
+            shutil.rmtree(cls.dirname)
+            raise unittest.SkipTest("The second mount is not set")
+        # the test folder as it's seen through the second mount
+        cls.other_dirname = os.path.join(second_mount, os.path.basename(cls.dirname))
+        logging.debug("Test folder in the second mount " + cls.other_dirname + "\n")
+        if wait_visible(lambda: os.path.isdir(cls.other_dirname))[0] is None:
+            shutil.rmtree(cls.dirname)
+            raise unittest.SkipTest("The test folder is not visible in the second mount " + second_mount)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def other_path(self, path):
+        """Returns the path of the file of the test folder in the second mount"""
+        return os.path.join(self.other_dirname, os.path.relpath(path, self.dirname))
+
+    def create_visible_file(self, prefix, content=""):
+        """Creates a file through the first mount and waits until it's visible through the second one"""
+        path = os.path.join(self.dirname, prefix + "-" + str(uuid.uuid4()))
+        with open(path, mode='x') as file:
+            file.write(content)
+        self.assertIsNotNone(wait_visible(lambda: os.path.exists(self.other_path(path)))[0],
+                             "The file is not visible in the second mount")
+        return path
+
+    def report(self, operation, histogram, polls, description=""):
+        """Adds the visibility latency of the operation to the benchmark results"""
+        result = "{:<10}visible p50={:.3f}ms p95={:.3f}ms p99={:.3f}ms max={:.3f}ms  stale checks {}".format(
+            operation, histogram.percentile(50) * 1000, histogram.percentile(95) * 1000,
+            histogram.percentile(99) * 1000, histogram.maximum * 1000, polls)
+        benchmark.add_result(self, result + description)
+
+    def measure(self, operation, change, check):
+        """Makes the change the number of times and waits until every change is visible through the second mount
+
+        change(number) makes the change through the first mount and returns an argument of check; check(argument)
+        returns True when the change is visible through the second mount.
+        """
+        histogram = benchmark.Histogram()
+        total_polls = 0
+        for number in range(iterations):
+            argument = change(number)
+            latency, polls = wait_visible(lambda: check(argument))
+            total_polls += polls
+            self.assertIsNotNone(latency, operation + " is not visible in " + str(timeout) + "s")
+            histogram.add(latency)
+        self.report(operation, histogram, total_polls)
+
+    def test_data_visibility(self):
+        """TC911 Two clients: visibility of written data
+
+        The test verifies close-to-open consistency and measures how soon data written by one client is read
+        by another one
+
+        Steps:
+            1. Create a file through the first mount, wait until it's visible through the second one
+            2. Open the file through the second mount and keep it open
+            3. Write a new random string to the file through the first mount and close it
+            4. Read the file through the descriptor from Step 2 until the string from Step 3 is read,
+               measure the time
+            5. Write another random string to the file through the first mount and close it
+            6. Open the file through the second mount and read it (close-to-open)
+            7. Repeat Steps 3-6 the number of times
+
+        Expected results:
+            1. The string from Step 3 is read in Step 4; visibility latency percentiles are written to the log
+            2. Every read in Step 6 returns the string from Step 5
+        """
+        logging.debug("Starting test: " + str(self.test_data_visibility.__doc__.split('\n', 1)[0]))
+
+        path = self.create_visible_file("data", str(uuid.uuid4()))
+        other_fd = os.open(self.other_path(path), os.O_RDONLY)
+        try:
+            histogram = benchmark.Histogram()
+            total_polls = 0
+            stale_opens = 0
+            for number in range(iterations):
+                string = str(uuid.uuid4())
+                with open(path, mode='w') as file:
+                    file.write(string)
+                latency, polls = wait_visible(lambda: os.pread(other_fd, 64, 0).decode() == string)
+                total_polls += polls
+                self.assertIsNotNone(latency, "Data is not visible to the open file in " + str(timeout) + "s")
+                histogram.add(latency)
+
+                # opening the file after it's closed by the writer must revalidate the cached data
+                string = str(uuid.uuid4())
+                with open(path, mode='w') as file:
+                    file.write(string)
+                if read_file(self.other_path(path)) != string:
+                    stale_opens += 1
+        finally:
+            os.close(other_fd)
+        self.report("data", histogram, total_polls, "  stale opens {}".format(stale_opens))
+        self.assertEqual(0, stale_opens, "Close-to-open consistency is broken")
+
+    def test_create_visibility(self):
+        """TC912 Two clients: visibility of a created file
+
+        The test measures how soon a file created by one client is found by another one, which has already
+        looked up its name (negative lookup cache)
+
+        Steps:
+            1. Look up a new file name through the second mount
+            2. Create the file through the first mount
+            3. Look up the name through the second mount until the file is found, measure the time
+            4. Repeat Steps 1-3 the number of times
+
+        Expected results:
+            The file is found in Step 3; visibility latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_create_visibility.__doc__.split('\n', 1)[0]))
+
+        def create(number):
+            path = os.path.join(self.dirname, "created-" + str(uuid.uuid4()))
+            self.assertFalse(os.path.exists(self.other_path(path)))
+            open(path, mode='x').close()
+            return self.other_path(path)
+
+        self.measure("create", create, os.path.exists)
+
+    def test_rename_visibility(self):
+        """TC913 Two clients: visibility of a renamed file
+
+        The test measures how soon a file renamed by one client is found under the new name by another one
+
+        Steps:
+            1. Create a file through the first mount, wait until it's visible through the second one
+            2. Rename the file through the first mount
+            3. Look up the new name through the second mount until the file is found, measure the time
+            4. Repeat Steps 2-3 the number of times
+
+        Expected results:
+            The file is found under the new name in Step 3; visibility latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_rename_visibility.__doc__.split('\n', 1)[0]))
+
+        paths = [self.create_visible_file("rename")]
+
+        def rename(number):
+            new_path = os.path.join(self.dirname, "renamed-" + str(uuid.uuid4()))
+            os.rename(paths[-1], new_path)
+            paths.append(new_path)
+            return self.other_path(new_path)
+
+        self.measure("rename", rename, os.path.exists)
+
+    def test_chmod_visibility(self):
+        """TC914 Two clients: visibility of changed permissions
+
+        The test measures how soon permissions changed by one client are seen by another one (attribute cache)
+
+        Steps:
+            1. Create a file through the first mount, wait until it's visible through the second one
+            2. Change the permissions of the file through the first mount
+            3. Get status of the file through the second mount until the new permissions are seen, measure the time
+            4. Repeat Steps 2-3 the number of times with different permissions
+
+        Expected results:
+            The new permissions are seen in Step 3; visibility latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_chmod_visibility.__doc__.split('\n', 1)[0]))
+
+        path = self.create_visible_file("chmod")
+
+        def chmod(number):
+            mode = 0o600 | (0o044 if number % 2 else 0o004)
+            os.chmod(path, mode)
+            return mode
+
+        self.measure("chmod", chmod, lambda mode: os.stat(self.other_path(path)).st_mode & 0o777 == mode)
+
+    def test_acl_visibility(self):
+        """TC915 Two clients: visibility of a changed NFSv4 ACL
+
+        The test measures how soon an ACL changed by one client is seen by another one
+
+        Steps:
+            1. Create a file through the first mount, wait until it's visible through the second one
+            2. Add an ACE to the ACL of the file through the first mount
+            3. Read the ACL of the file through the second mount until the new ACL is read, measure the time
+            4. Repeat Steps 2-3 the number of times with different ACEs
+
+        Expected results:
+            The new ACL is read in Step 3; visibility latency percentiles are written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_acl_visibility.__doc__.split('\n', 1)[0]))
+
+        path = self.create_visible_file("acl")
+        try:
+            original_acl = nfs4acl.get_acl(path)
+        except OSError as error:
+            self.skipTest("NFSv4 ACL are not supported: " + str(error))
+
+        def add_ace(number):
+            acl = [nfs4acl.Ace.from_string("A::EVERYONE@:" + ("r" if number % 2 else "w"), False)] + original_acl
+            nfs4acl.set_acl(path, acl)
+            return nfs4acl.get_acl(path)  # the ACL as it's stored by the server
+
+        self.measure("acl", add_ace, lambda acl: nfs4acl.get_acl(self.other_path(path)) == acl)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import shutil
+import time
+import unittest
+import uuid
+import logging
+import concurrent.futures
+
+import benchmark
+import integrity
+from pythonTestTask import base_dir_name, get_option_value
+
+# size and number of the files, number of threads and the seed of the content, can be changed with
+# "--integrity-size", "--integrity-files", "--integrity-threads" and "--integrity-seed" command line arguments
+file_size = benchmark.parse_size(get_option_value('--integrity-size', '256M'))
+files = int(get_option_value('--integrity-files', 4))
+threads = int(get_option_value('--integrity-threads', 4))
+seed = int(get_option_value('--integrity-seed', random.randrange(2 ** 32)))
+
+
+class TestDataIntegrity(unittest.TestCase):
+    """Data integrity tests"""
+
+    dirname = os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))  # folder to run tests
+
+    @classmethod
+    def setUpClass(cls):
+        os.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(TestDataIntegrity.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+        logging.debug("Seed of the content: " + str(seed))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dirname)
+
+    def test_large_files_integrity(self):
+        """TC921 Integrity of large files in several threads
+
+        The test verifies that the content of large files is read back unchanged and measures throughput
+
+        Steps:
+            1. Write the number of files of the size with the content generated from the seed in several threads,
+               every file is written by one thread; keep the digests of the chunks of every file
+            2. Sync the files and drop their cached pages
+            3. Read the files chunk by chunk in several threads and compare the digests of the chunks
+               with the digests from Step 1
+
+        Expected results:
+            No corrupted chunks are found in Step 3; throughput of writing and verifying is written to the log
+        """
+        logging.debug("Starting test: " + str(self.test_large_files_integrity.__doc__.split('\n', 1)[0]))
+
+        jobs = [(os.path.join(self.dirname, "integrity-" + str(number)), integrity.Pattern(seed + number))
+                for number in range(files)]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            start_time = time.perf_counter()
+            manifests = list(executor.map(lambda job: integrity.write_file(job[0], file_size, job[1]), jobs))
+            write_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            corruptions = list(executor.map(lambda job, manifest: integrity.verify_file(
+                job[0], file_size, job[1], manifest), jobs, manifests))
+            verify_time = time.perf_counter() - start_time
+
+        total_size = file_size * files
+        benchmark.add_result(self, "files={} size={:<6}threads={:<4}write {:>8.1f} MB/s  verify {:>8.1f} MB/s  "
+                                   "seed={}".format(
+            files, benchmark.format_size(file_size), threads, total_size / write_time / 1024 ** 2,
+            total_size / verify_time / 1024 ** 2, seed))
+        for (path, pattern), offsets in zip(jobs, corruptions):
+            if offsets:
+                logging.error("Corrupted file {}, offsets: {}".format(path, offsets[:10]))
+        self.assertEqual([[]] * files, corruptions, "Corrupted chunks found")
+
+    def test_corruption_detection(self):
+        """TC922 Detection of corrupted and truncated files
+
+        The test verifies that the integrity check finds the offsets of corrupted bytes
+
+        Steps:
+            1. Write a file of several chunks with the content generated from the seed, keep the digests
+            2. Change one byte in the second chunk and the last byte of the file
+            3. Verify the file
+            4. Truncate the file in the middle of the third chunk
+            5. Verify the file
+
+        Expected results:
+            1. The offsets found in Step 3 are the offsets of the changed bytes
+            2. The offsets found in Step 5 are the offset of the changed byte and the offset of the end of the file
+        """
+        logging.debug("Starting test: " + str(self.test_corruption_detection.__doc__.split('\n', 1)[0]))
+
+        size = 4 * integrity.chunk_size
+        path = os.path.join(self.dirname, "corrupted-" + str(uuid.uuid4()))
+        pattern = integrity.Pattern(seed)
+        manifest = integrity.write_file(path, size, pattern)
+
+        offsets = [integrity.chunk_size + 12345, size - 1]
+        fd = os.open(path, os.O_RDWR)
+        try:
+            for offset in offsets:
+                os.pwrite(fd, bytes([os.pread(fd, 1, offset)[0] ^ 0xff]), offset)
+        finally:
+            os.close(fd)
+        self.assertEqual(offsets, integrity.verify_file(path, size, pattern, manifest))
+
+        end = 2 * integrity.chunk_size + 1000
+        os.truncate(path, end)
+        self.assertEqual([offsets[0], end], integrity.verify_file(path, size, pattern, manifest))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,12 +3,14 @@
 
 import unittest
 import os
-import shutil
 import uuid
-import stat
-import subprocess
 import logging
 
+import backends
+import budgets
+import fixtures
+import probes
+import timing
 from pythonTestTask import base_dir_name
 
 
@@ -19,157 +21,139 @@ class TestFileAttributes(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        os.mkdir(cls.dirname)
+        cls.fs = backends.current  # file system backend of the tests
+        cls.fs.mkdir(cls.dirname)
         logging.debug("Starting test group: " + str(TestFileAttributes.__doc__.split('\n', 1)[0]))
         logging.debug("Test folder " + cls.dirname + "\n")
 
+        # files with the permissions prepared for the tests: TC101, TC102, TC103 and TC104
+        cls.pool = fixtures.FixturePool(cls.dirname, {'script': 1, 'executable': 1, 'read-only': 1, 'write-only': 1},
+                                        TestFileAttributes.__doc__)
+        cls.pool.fill()
+
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(cls.dirname)
+        cls.fs.rmtree(cls.dirname)
 
+    @budgets.budget(2)
     def test_executable_bit_not_set(self):
         """TC101 Run a file with the executable bit not set
 
         The test verifies, that it's not possible to run a file with the executable bit not set
 
         Steps:
-            1. Create a file containing a shell-script
-            2. Change permissions of the file: the current user is the file owner, the executable bit is not set
-            3. Check possibility to run the script with os.access()
-            4. Try to run the script
+            1. Take a file containing a shell-script prepared in the beginning of the group,
+               the current user is the file owner, the executable bit is not set
+            2. Check possibility to run the script with os.access()
+            3. Try to run the script
 
         Expected results:
-            1. os.access() from Step 3 return False
+            1. os.access() from Step 2 return False
             2. The attempt to run the script rises the "PermissionError" exception
         """
 
         logging.debug("Starting test: " + str(self.test_executable_bit_not_set.__doc__.split('\n', 1)[0]))
 
-        # generate the filename
-        filename = "no_exec_file-" + str(uuid.uuid4())
+        # take a created script, the current user is the owner of the file (it affects to possibility to run
+        # the script), the executable bit is not set
+        filename = os.path.basename(self.pool.claim('script').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
-
-        # prepare the file for the test
-        with open(os.path.join(self.dirname, filename), mode='w') as file:
-            file.write("#!/bin/sh\necho test")
-        logging.debug("File created: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
-
-        # make the current user the owner of the file (it affects to possibility to run the script)
-        # the executable bit is not set
-        os.chmod(os.path.join(self.dirname, filename), stat.S_IRUSR)
-        logging.debug("File is executable: " + str(os.access(os.path.join(self.dirname, filename), os.X_OK)))
+        probes.debug("File created: ", self.fs.isfile, os.path.join(self.dirname, filename))
+        probes.debug("File is executable: ", self.fs.access, os.path.join(self.dirname, filename), os.X_OK)
 
         # check result with os.access()
-        self.assertFalse(os.access(os.path.join(self.dirname, filename), os.X_OK))
+        self.assertFalse(self.fs.access(os.path.join(self.dirname, filename), os.X_OK))
         # check that an attempt to run the script rises the exception
         with self.assertRaises(PermissionError):
-            subprocess.Popen(os.path.join(self.dirname, filename))
+            self.fs.run(os.path.join(self.dirname, filename))
 
+    @budgets.budget(2)
     def test_set_executable_bit(self):
         """TC102 Run a file with executable bit set
 
         The test verifies possibility to run a file with the executable bit set
 
         Steps:
-            1. Prepare a randomly generated string
-            2. Create a file containing a shell-script, which writes the string from Step 1 to the console 
-            3. Change the file permissions: the current user is the file owner, the executable bit is set
-            4. Run the script
-            5. Read the output of the script
+            1. Take a file containing a shell-script, which writes a randomly generated string to the console,
+               prepared in the beginning of the group, the current user is the file owner, the executable bit is set
+            2. Run the script
+            3. Read the output of the script
 
         Expected results:
-            The output of the shell-script from Step 2 and the string from Step 1 are equal
+            The output of the shell-script from Step 3 and the string written by the script from Step 1 are equal
         """
         logging.debug("Starting test: " + str(self.test_set_executable_bit.__doc__.split('\n', 1)[0]))
 
-        # generating the string
-        string = str(uuid.uuid4())
+        # take a created script writing a random string, the current user is the owner of the file
+        # (it affects to possibility to run the script), the executable bit is set
+        fixture = self.pool.claim('executable')
+        string = fixture.value
         logging.debug("Expected string: " + string)
-
-        # generating the filename
-        filename = "exec_file-" + str(uuid.uuid4())
+        filename = os.path.basename(fixture.path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
-
-        # prepare the file for the test
-        with open(os.path.join(self.dirname, filename), mode='w') as file:
-            file.write("#!/bin/sh\necho " + string)
-
-        # make the current user the owner of the file (it affects to possibility to run the script)
-        # and set the executable bit
-        os.chmod(os.path.join(self.dirname, filename), stat.S_IXUSR | stat.S_IRUSR)
-        logging.debug("File executable: " + str(os.access(os.path.join(self.dirname, filename), os.X_OK)))
+        probes.debug("File executable: ", self.fs.access, os.path.join(self.dirname, filename), os.X_OK)
 
         # read the output of the run script
         # 'output' variable contains newline-symbol, it needs to be deleted with strip()
-        output = os.popen(os.path.join(self.dirname, filename)).read().strip()
+        output = self.fs.run(os.path.join(self.dirname, filename)).strip()
         logging.debug("Output string: " + str(output))
 
         # check that the output of the run script and the generated string are equal
-        self.assertEqual(string, output)
+        with timing.phase('assertions'):
+            self.assertEqual(string, output)
 
+    @budgets.budget(1)
     def test_has_not_write_permission(self):
         """TC103 Write to a file without write permissions
 
         The test verifies that it's not possible to write to a file without write permission
 
         Steps:
-            1. Create a new file
-            2. Change permissions of the file: the current user has the permission to read, not to write
-            3. Write to the file
+            1. Take a file prepared in the beginning of the group,
+               the current user has the permission to read, not to write
+            2. Write to the file
 
         Expected results:
             The attempt to write to the file rises the exception "PermissionError"
         """
         logging.debug("Starting test: " + str(self.test_has_not_write_permission.__doc__.split('\n', 1)[0]))
 
-        # generate the filename
-        filename = "write_file-" + str(uuid.uuid4())
+        # take a created file, the current user has permission to read, not to write
+        filename = os.path.basename(self.pool.claim('read-only').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
-
-        # create the file with the generated filename
-        open(os.path.join(self.dirname, filename), mode='x').close()
-        logging.debug("File created: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
-
-        # give the current user permission to read, not to write
-        os.chmod(os.path.join(self.dirname, filename), stat.S_IRUSR)
-        logging.debug("File has the write permission: " + str(os.access(os.path.join(self.dirname, filename), os.W_OK)))
+        probes.debug("File created: ", self.fs.isfile, os.path.join(self.dirname, filename))
+        probes.debug("File has the write permission: ", self.fs.access, os.path.join(self.dirname, filename), os.W_OK)
 
         # try to write in the file
         with self.assertRaises(PermissionError):
-            with open(os.path.join(self.dirname, filename), mode='w') as file:
+            with self.fs.open(os.path.join(self.dirname, filename), mode='w') as file:
                 file.write(str(uuid.uuid4()))
 
+    @budgets.budget(1)
     def test_has_not_read_permission(self):
         """TC104 Read from a file without read permissions
 
         The test verifies that it's not possible to read from a file without the read permission
 
         Steps:
-            1. Create a new file with a some content
-            2. Change permissions of the file: the current user has the permission to write, not to read
-            3. Read the file
+            1. Take a file with some content prepared in the beginning of the group,
+               the current user has the permission to write, not to read
+            2. Read the file
 
         Expected results:
             Attempt to read from the file rises the exception "PermissionError"
         """
         logging.debug("Starting test: " + str(self.test_has_not_read_permission.__doc__.split('\n', 1)[0]))
 
-        # generate the filename
-        filename = "read_file-" + str(uuid.uuid4())
+        # take a created file with some content, the current user has the permission to write, not to read
+        filename = os.path.basename(self.pool.claim('write-only').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
-
-        # create the file with the generated filename
-        with open(os.path.join(self.dirname, filename), mode='w') as file:
-            file.write(str(uuid.uuid4()))
-        logging.debug("File was created: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
-
-        # give the current user the permission to write, not to read
-        os.chmod(os.path.join(self.dirname, filename), stat.S_IWUSR)
-        logging.debug("File has the read permission: " + str(os.access(os.path.join(self.dirname, filename), os.R_OK)))
+        probes.debug("File was created: ", self.fs.isfile, os.path.join(self.dirname, filename))
+        probes.debug("File has the read permission: ", self.fs.access, os.path.join(self.dirname, filename), os.R_OK)
 
         # try to read from the file
         with self.assertRaises(PermissionError):
-            with open(os.path.join(self.dirname, filename), mode='r') as file:
+            with self.fs.open(os.path.join(self.dirname, filename), mode='r') as file:
                 file.read()
 
 
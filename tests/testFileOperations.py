@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import os
-import shutil
 import uuid
 import unittest
 import logging
 
+import backends
+import budgets
+import fixtures
+import probes
+import timing
 from pythonTestTask import base_dir_name
 
 
@@ -17,14 +21,20 @@ class TestFileOperations(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        os.mkdir(cls.dirname)
+        cls.fs = backends.current  # file system backend of the tests
+        cls.fs.mkdir(cls.dirname)
         logging.debug("Starting test group: " + str(TestFileOperations.__doc__.split('\n', 1)[0]))
         logging.debug("Test folder " + cls.dirname + "\n")
 
+        # files prepared for the tests: TC002 and TC005
+        cls.pool = fixtures.FixturePool(cls.dirname, {'empty': 1, 'uuid': 1}, TestFileOperations.__doc__)
+        cls.pool.fill()
+
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(cls.dirname)
+        cls.fs.rmtree(cls.dirname)
 
+    @budgets.budget(1)
     def test_create_file(self):
         """TC001 Create a file
 
@@ -45,44 +55,48 @@ class TestFileOperations(unittest.TestCase):
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
 
         # file creating
-        open(os.path.join(self.dirname, filename), mode='x').close()
-        logging.debug("File created: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
+        self.fs.open(os.path.join(self.dirname, filename), mode='x').close()
+        probes.debug("File created: ", self.fs.isfile, os.path.join(self.dirname, filename))
 
         # check if a file was created
-        self.assertTrue(os.path.isfile(os.path.join(self.dirname, filename)))
+        with timing.phase('assertions'):
+            self.assertTrue(self.fs.isfile(os.path.join(self.dirname, filename)))
 
+    @budgets.budget(1)
     def test_delete_file(self):
         """TC002 Delete an existing file
 
         The test verifies possibility to delete an existing file
 
         Steps:
-            1. Create a new file
-            2. Check that the file has been created
+            1. Take an empty file prepared in the beginning of the group
+            2. Check that the file exists
             3. Delete the file
             4. Check that the file has been deleted
 
         Expected results:
-            The created file is absent in the folder's file list (has been deleted)
+            The file is absent in the folder's file list (has been deleted)
         """
         logging.debug("Starting test: " + str(self.test_delete_file.__doc__.split('\n', 1)[0]))
 
-        # file creating
-        filename = "new_file-" + str(uuid.uuid4())
+        # take a created empty file
+        filename = os.path.basename(self.pool.claim('empty').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
-        open(os.path.join(self.dirname, filename), mode='x').close()
 
         # check assert, that this file has been really created
-        logging.debug("File created: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
-        self.assertTrue(os.path.isfile(os.path.join(self.dirname, filename)), "File was not created!!!")
+        probes.debug("File created: ", self.fs.isfile, os.path.join(self.dirname, filename))
+        with timing.phase('assertions'):
+            self.assertTrue(self.fs.isfile(os.path.join(self.dirname, filename)), "File was not created!!!")
 
         # delete file
-        os.remove(os.path.join(self.dirname, filename))
-        logging.debug("File exists after deleting: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
+        self.fs.remove(os.path.join(self.dirname, filename))
+        probes.debug("File exists after deleting: ", self.fs.isfile, os.path.join(self.dirname, filename))
 
         # check the file is absent in the folder's file list
-        self.assertNotIn(filename, os.listdir(self.dirname))
+        with timing.phase('assertions'):
+            self.assertNotIn(filename, self.fs.listdir(self.dirname))
 
+    @budgets.budget(1)
     def test_delete_not_existing_file(self):
         """TC003 Delete not existing file
 
@@ -100,12 +114,13 @@ class TestFileOperations(unittest.TestCase):
         # creating filename
         filename = "not-exist-file" + str(uuid.uuid4())
         logging.debug("Not exist file name: " + os.path.join(self.dirname, filename))
-        logging.debug("File exists: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
+        probes.debug("File exists: ", self.fs.isfile, os.path.join(self.dirname, filename))
 
         # try to delete non existing file
         with self.assertRaises(FileNotFoundError):
-            os.remove(os.path.join(self.dirname, filename))
+            self.fs.remove(os.path.join(self.dirname, filename))
 
+    @budgets.budget(1)
     def test_write_to_file(self):
         """TC004 Write to a file
 
@@ -132,62 +147,60 @@ class TestFileOperations(unittest.TestCase):
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
 
         # create a file containing the string
-        with open(os.path.join(self.dirname, filename), mode='w') as file:
+        with self.fs.open(os.path.join(self.dirname, filename), mode='w') as file:
             file.write(string)
-        logging.debug("File exist: " + str(os.path.isfile(os.path.join(self.dirname, filename))))
+        probes.debug("File exist: ", self.fs.isfile, os.path.join(self.dirname, filename))
 
         # read the file content and compare with the initial string
-        read_string = open(os.path.join(self.dirname, filename), mode='r').read()
+        read_string = self.fs.open(os.path.join(self.dirname, filename), mode='r').read()
         logging.debug("Read string: " + read_string)
-        self.assertEqual(string, read_string)
+        with timing.phase('assertions'):
+            self.assertEqual(string, read_string)
 
+    @budgets.budget(1)
     def test_file_renaming(self):
         """TC005 Rename a file
 
         The test verifies correctness of a file renaming
 
         Steps:
-            1. Prepare a randomly generated string
-            2. Prepare an initial filename and a new filename
-            3. Create a file with the initial filename from Step 2 and containing the string from Step 1
-            4. Rename file from the initial name to the new name from Step 2
-            5. Read the content of the file with the new name
-            6. Compare the read file content and the string from Step 1
+            1. Take a file containing a randomly generated string prepared in the beginning of the group
+            2. Prepare a new filename
+            3. Rename the file from Step 1 to the new name from Step 2
+            4. Read the content of the file with the new name
+            5. Compare the read file content and the string from Step 1
 
         Expected results:
-            Content of the file from Step 5 and the string from Step 1 are equal
+            Content of the file from Step 4 and the string from Step 1 are equal
         """
 
         logging.debug("Starting test: " + str(self.test_file_renaming.__doc__.split('\n', 1)[0]))
 
-        # prepare the string
-        string = str(uuid.uuid4())
+        # take a created file containing a random string
+        fixture = self.pool.claim('uuid')
+        string = fixture.value
         logging.debug("Expected string: " + string)
 
         # prepare the file names
-        initial_name = "initial_name-" + str(uuid.uuid4())
+        initial_name = os.path.basename(fixture.path)
         new_name = "new_name-" + str(uuid.uuid4())
         logging.debug("Initial filename: " + os.path.join(self.dirname, initial_name))
         logging.debug("New filename: " + os.path.join(self.dirname, new_name))
-
-        # create the initial file
-        with open(os.path.join(self.dirname, initial_name), mode='w') as file:
-            file.write(string)
-        logging.debug("File with the initial name exists: " + str(os.path.isfile(os.path.join(self.dirname, initial_name))))
-        logging.debug("File with the new name exists: " + str(os.path.isfile(os.path.join(self.dirname, new_name))))
+        probes.debug("File with the initial name exists: ", self.fs.isfile, os.path.join(self.dirname, initial_name))
+        probes.debug("File with the new name exists: ", self.fs.isfile, os.path.join(self.dirname, new_name))
 
         # rename the file
-        os.rename(os.path.join(self.dirname, initial_name), os.path.join(self.dirname, new_name))
-        logging.debug(
-            "File with the initial name after renaming exist: "
-            + str(os.path.isfile(os.path.join(self.dirname, initial_name))))
-        logging.debug("File with the new name after renaming exist: "
-                      + str(os.path.isfile(os.path.join(self.dirname, new_name))))
+        self.fs.rename(os.path.join(self.dirname, initial_name), os.path.join(self.dirname, new_name))
+        probes.debug("File with the initial name after renaming exist: ",
+                     self.fs.isfile, os.path.join(self.dirname, initial_name))
+        probes.debug("File with the new name after renaming exist: ",
+                     self.fs.isfile, os.path.join(self.dirname, new_name))
 
         # check that the content of the file with the new name and the generated string are equal
-        read_string = open(os.path.join(self.dirname, new_name), mode='r').read()
+        read_string = self.fs.open(os.path.join(self.dirname, new_name), mode='r').read()
         logging.debug("Read string: " + read_string)
-        self.assertEqual(string, read_string)
+        with timing.phase('assertions'):
+            self.assertEqual(string, read_string)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,11 @@
 import unittest
-import shutil
 import os
 import logging
 import uuid
 
+import backends
+import fixtures
+import probes
 from pythonTestTask import base_dir_name
 
 
@@ -14,13 +16,18 @@ class TestNfs4Acl(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        os.mkdir(cls.dirname)
+        cls.fs = backends.current  # file system backend of the tests
+        cls.fs.mkdir(cls.dirname)
         logging.debug("Starting test group: " + str(TestNfs4Acl.__doc__.split('\n', 1)[0]))
         logging.debug("Test folder " + cls.dirname + "\n")
 
+        # files prepared for the tests: TC201 and TC202
+        cls.pool = fixtures.FixturePool(cls.dirname, {'uuid': 1, 'empty': 1}, TestNfs4Acl.__doc__)
+        cls.pool.fill()
+
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(cls.dirname)
+        cls.fs.rmtree(cls.dirname)
 
     def test_deny_read_permission(self):
         """TC201 NFSv4 ACL: deny reading a file to its owner
@@ -37,30 +44,22 @@ class TestNfs4Acl(unittest.TestCase):
         """
         logging.debug("Starting test: " + str(self.test_deny_read_permission.__doc__.split('\n', 1)[0]))
 
-        # generate the string
-        string = str(uuid.uuid4())
-        logging.debug("Expected string: " + string)
-
-        # generate the filename
-        filename = "not_read_file-" + str(uuid.uuid4())
+        # take a created file containing a random string
+        filename = os.path.basename(self.pool.claim('uuid').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
 
-        # prepare the file for the test
-        with open(os.path.join(self.dirname, filename), mode='w') as file:
-            file.write(string)
-
-        logging.debug("ACL for a file before changing permissions:\n"
-                      + str(os.popen("nfs4_getfacl " + os.path.join(self.dirname, filename)).read().strip()))
+        probes.debug("ACL for a file before changing permissions:\n",
+                     self.fs.get_acl_text, os.path.join(self.dirname, filename))
 
         # change NFSv4 ACL permission to deny reading to the file owner
-        os.system("nfs4_setfacl -a D::OWNER@:R " + os.path.join(self.dirname, filename))
+        self.fs.add_ace(os.path.join(self.dirname, filename), "D::OWNER@:R")
 
-        logging.debug("ACL for a file after changing permissions:\n"
-                      + str(os.popen("nfs4_getfacl " + os.path.join(self.dirname, filename)).read().strip()))
+        probes.debug("ACL for a file after changing permissions:\n",
+                     self.fs.get_acl_text, os.path.join(self.dirname, filename))
 
         # try to read the file
         with self.assertRaises(PermissionError):
-            with open(os.path.join(self.dirname, filename), mode='r') as file:
+            with self.fs.open(os.path.join(self.dirname, filename), mode='r') as file:
                 file.read()
 
     def test_deny_write_permission(self):
@@ -82,25 +81,22 @@ class TestNfs4Acl(unittest.TestCase):
         string = str(uuid.uuid4())
         logging.debug("Expected string: " + string)
 
-        # generate the filename
-        filename = "not_write_file-" + str(uuid.uuid4())
+        # take a created empty file
+        filename = os.path.basename(self.pool.claim('empty').path)
         logging.debug("New file name: " + os.path.join(self.dirname, filename))
 
-        # prepare the file for the test
-        open(os.path.join(self.dirname, filename), mode='x').close()
-
-        logging.debug("ACL for a file before changing permissions:\n"
-                      + str(os.popen("nfs4_getfacl " + os.path.join(self.dirname, filename)).read().strip()))
+        probes.debug("ACL for a file before changing permissions:\n",
+                     self.fs.get_acl_text, os.path.join(self.dirname, filename))
 
         # change NFSv4 ACL permission to deny writing to the file owner
-        os.system("nfs4_setfacl -a D::OWNER@:W " + os.path.join(self.dirname, filename))
+        self.fs.add_ace(os.path.join(self.dirname, filename), "D::OWNER@:W")
 
-        logging.debug("ACL for a file after changing permissions:\n"
-                      + str(os.popen("nfs4_getfacl " + os.path.join(self.dirname, filename)).read().strip()))
+        probes.debug("ACL for a file after changing permissions:\n",
+                     self.fs.get_acl_text, os.path.join(self.dirname, filename))
 
         # try to write to the file
         with self.assertRaises(PermissionError):
-            with open(os.path.join(self.dirname, filename), mode='w') as file:
+            with self.fs.open(os.path.join(self.dirname, filename), mode='w') as file:
                 file.write(string)
 
 
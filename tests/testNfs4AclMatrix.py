@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""NFSv4 ACL permission matrix
+
+The test cases are generated from the declarative matrix below: every combination of an ACE type, a permission,
+a principal, a kind of the object and an ordering of ACEs is a test case with its own TC ID (TC5001 and further).
+The cases are grouped in slices - one test class per principal and kind of the object. Every slice prepares
+one fixture (the object and its child, if the object is a folder) in setUpClass; a test case only changes the ACL
+of the fixture, checks the permission and restores the original ACL.
+
+The expected results depend on the ACL model of the backend ("acl_model"). With the "nfs4" model (the memory
+backend) the ACL evaluation of RFC 7530 decides: the first ACE matching the user decides. With the "posix" model
+(Linux knfsd storing NFSv4 ACL as POSIX ACL) the ACL is mapped to POSIX ACL permissions like knfsd does
+(see posix_permissions()), and the POSIX ACL entry of the user decides; reading the ACL is permitted to everyone,
+changing the ACL and the owner to the owner of the object only. DELETE of the object has no POSIX counterpart,
+the cases of "d" are skipped with the "posix" model.
+"""
+
+import os
+import errno
+import unittest
+import logging
+import uuid
+
+import backends
+import nfs4acl
+from pythonTestTask import base_dir_name
+
+matrix = {
+    'ace_types': ('A', 'D'),
+    # permissions in the nfs4_setfacl format; "R", "W", "X" are generic read, write and execute
+    'permissions': ('R', 'W', 'X', 'a', 'D', 'd', 'c', 'C', 'o'),
+    'principals': ('OWNER@', 'GROUP@', 'EVERYONE@'),
+    'kinds': ('file', 'directory'),
+    # "single": only the tested ACE is added,
+    # "first": the tested ACE is added before the ACE of the opposite type for the same principal and permission,
+    # "second": the tested ACE is added after the ACE of the opposite type
+    'orderings': ('single', 'first', 'second'),
+}
+
+opposite_types = {'A': 'D', 'D': 'A'}
+
+first_tc_number = 5001
+
+
+def check_read(case, path, aces):
+    """Reads the file or lists the folder"""
+    if case.kind == 'file':
+        with case.fs.open(path, mode='r') as file:
+            file.read()
+    else:
+        case.fs.listdir(path)
+
+
+def check_write(case, path, aces):
+    """Opens the file for writing or creates a file in the folder"""
+    if case.kind == 'file':
+        case.fs.open_flags(path, os.O_WRONLY).close()
+    else:
+        child = os.path.join(path, "new_file-" + str(uuid.uuid4()))
+        case.fs.open_flags(child, os.O_WRONLY | os.O_CREAT | os.O_EXCL).close()
+        case.addCleanup(case.fs.remove, child)
+
+
+def check_execute(case, path, aces):
+    """Checks execute permission of the file or looks up the child of the folder"""
+    if case.kind == 'file':
+        if not case.fs.access(path, os.X_OK):
+            raise PermissionError(errno.EACCES, "Execute is not permitted", path)
+    else:
+        case.fs.stat(os.path.join(path, "child"))
+
+
+def check_append(case, path, aces):
+    """Opens the file for appending or creates a subfolder in the folder"""
+    if case.kind == 'file':
+        case.fs.open_flags(path, os.O_WRONLY | os.O_APPEND).close()
+    else:
+        child = os.path.join(path, "new_folder-" + str(uuid.uuid4()))
+        case.fs.mkdir(child)
+        case.addCleanup(case.fs.rmdir, child)
+
+
+def check_delete_child(case, path, aces):
+    """Deletes the child of the folder"""
+    case.fs.remove(os.path.join(path, "child"))
+    case.addCleanup(case.create_child)
+
+
+def check_delete(case, path, aces):
+    """Moves the object out of its name (deletes the name) and back"""
+    case.fs.rename(path, path + "-moved")
+    case.fs.rename(path + "-moved", path)
+
+
+def check_read_acl(case, path, aces):
+    """Reads the ACL"""
+    case.fs.get_acl(path)
+
+
+def check_write_acl(case, path, aces):
+    """Writes the current ACL again"""
+    case.fs.set_acl(path, aces)
+
+
+def check_write_owner(case, path, aces):
+    """Sets the owner of the object to its current owner"""
+    case.fs.chown(path, case.owner, -1)
+
+
+# the operation which requires the permission, for every permission and kind of the object
+checks = {
+    ('R', 'file'): check_read, ('R', 'directory'): check_read,
+    ('W', 'file'): check_write, ('W', 'directory'): check_write,
+    ('X', 'file'): check_execute, ('X', 'directory'): check_execute,
+    ('a', 'file'): check_append, ('a', 'directory'): check_append,
+    ('D', 'directory'): check_delete_child,
+    ('d', 'file'): check_delete, ('d', 'directory'): check_delete,
+    ('c', 'file'): check_read_acl, ('c', 'directory'): check_read_acl,
+    ('C', 'file'): check_write_acl, ('C', 'directory'): check_write_acl,
+    ('o', 'file'): check_write_owner, ('o', 'directory'): check_write_owner,
+}
+
+# the ACE added to the ACL of the test folder during the cases of "d": deleting is permitted by DELETE_CHILD
+# of the folder regardless of the DELETE permission of the object (RFC 8881, section 6.2.1.3.2)
+deny_delete_child = nfs4acl.Ace.from_string("D::EVERYONE@:D", is_directory=True)
+
+# the POSIX ACL permission deciding the permission of the case with the "posix" model: APPEND_DATA and
+# DELETE_CHILD are folded into the write permission
+posix_letters = {'R': 'r', 'W': 'w', 'X': 'x', 'a': 'w', 'D': 'w'}
+
+
+def posix_permissions(aces, is_directory):
+    """Maps the ACL to the POSIX ACL permissions of the owner, the owning group and others like Linux knfsd does
+
+    ACEs of OWNER@ and GROUP@ apply to the owner and the group entry, ACEs of EVERYONE@ to all entries; a bit is
+    allowed or denied by the first ACE containing it. A POSIX permission is granted if all its bits are allowed:
+    "r" - READ_DATA, "w" - WRITE_DATA and APPEND_DATA (and DELETE_CHILD for folders), "x" - EXECUTE.
+    Returns the dictionary of the entry ('owner', 'group', 'other') to its permissions, e.g. "rw".
+    """
+    entries = {'OWNER@': ('owner',), 'GROUP@': ('group',), 'EVERYONE@': ('owner', 'group', 'other')}
+    allowed = {'owner': 0, 'group': 0, 'other': 0}
+    denied = {'owner': 0, 'group': 0, 'other': 0}
+    for ace in aces:
+        if ace.flag & nfs4acl.ace_flag_letters['i']:
+            continue
+        for entry in entries.get(ace.who, ()):
+            if ace.type == nfs4acl.ace_type_letters['A']:
+                allowed[entry] |= ace.access_mask & ~denied[entry]
+            elif ace.type == nfs4acl.ace_type_letters['D']:
+                denied[entry] |= ace.access_mask & ~allowed[entry]
+
+    masks = [(letter, nfs4acl.Ace.from_string("A::EVERYONE@:" + bits).access_mask)
+             for letter, bits in (('r', 'r'), ('w', 'waD' if is_directory else 'wa'), ('x', 'x'))]
+    return {entry: ''.join(letter for letter, mask in masks if allowed[entry] & mask == mask) for entry in allowed}
+
+
+class AclMatrixSlice(unittest.TestCase):
+    """Base class of the NFSv4 ACL matrix slices; the slices are generated by make_slices()"""
+
+    principal = None
+    kind = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fs = backends.current  # file system backend of the tests
+        cls.fs.mkdir(cls.dirname)
+        logging.debug("Starting test group: " + str(cls.__doc__.split('\n', 1)[0]))
+        logging.debug("Test folder " + cls.dirname + "\n")
+
+        # prepare the fixture shared by all test cases of the slice
+        cls.path = os.path.join(cls.dirname, "object")
+        try:
+            cls.create_fixture()
+        except OSError as error:
+            cls.fs.rmtree(cls.dirname)
+            raise unittest.SkipTest("NFSv4 ACL are not supported: " + str(error))
+        logging.debug("Original ACL:\n" + nfs4acl.format_acl(cls.original_acl))
+
+        # check if the principal of the slice matches the current user
+        status = cls.fs.stat(cls.path)
+        cls.owner = status.st_uid
+        cls.is_owner = status.st_uid == os.geteuid()
+        in_group = status.st_gid == os.getegid() or status.st_gid in os.getgroups()
+        cls.principal_matches = {'OWNER@': cls.is_owner, 'GROUP@': in_group, 'EVERYONE@': True}[cls.principal]
+        # the POSIX ACL entry deciding the permissions of the user with the "posix" model
+        cls.posix_entry = 'owner' if cls.is_owner else 'group' if in_group else 'other'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fs.rmtree(cls.dirname)
+
+    @classmethod
+    def create_fixture(cls):
+        """Creates the object of the slice (and its child, if the object is a folder), reads its original ACL"""
+        if cls.kind == 'file':
+            with cls.fs.open(cls.path, mode='w') as file:
+                file.write(str(uuid.uuid4()))
+        else:
+            cls.fs.mkdir(cls.path)
+            cls.create_child()
+        cls.original_acl = cls.fs.get_acl(cls.path)
+
+    @classmethod
+    def create_child(cls):
+        """Creates the child file of the folder fixture"""
+        cls.fs.open(os.path.join(cls.path, "child"), mode='w').close()
+
+    @classmethod
+    def restore_fixture(cls):
+        """Restores the original ACL of the fixture
+
+        If the tested ACL denies changing the ACL to the user (WRITE_ACL), the fixture is deleted
+        (DELETE_CHILD of the test folder) and created again.
+        """
+        try:
+            cls.fs.set_acl(cls.path, cls.original_acl)
+        except PermissionError:
+            logging.debug("The ACL can't be restored, the fixture is created again")
+            if cls.kind == 'directory':
+                cls.fs.rmtree(cls.path)
+            else:
+                cls.fs.remove(cls.path)
+            cls.create_fixture()
+
+    def is_permitted(self, permission, aces):
+        """Sets the ACL of the fixture, runs the check of the permission and restores the original ACL
+
+        For "d" DELETE_CHILD of the test folder is denied during the check, so the ACL of the fixture decides.
+        Returns False if the check rises the exception "PermissionError", True otherwise.
+        """
+        self.fs.set_acl(self.path, aces)
+        folder_acl = self.fs.get_acl(self.dirname) if permission == 'd' else None
+        try:
+            if folder_acl is not None:
+                self.fs.set_acl(self.dirname, [deny_delete_child] + folder_acl)
+            checks[(permission, self.kind)](self, self.path, aces)
+        except PermissionError:
+            return False
+        finally:
+            if folder_acl is not None:
+                self.fs.set_acl(self.dirname, folder_acl)
+            self.restore_fixture()
+        return True
+
+    def posix_expected(self, permission, aces):
+        """Returns the expected result of the case with the "posix" model (Linux knfsd)"""
+        if permission == 'c':
+            return True
+        if permission in ('C', 'o'):
+            return self.is_owner
+        return posix_letters[permission] in posix_permissions(aces, self.kind == 'directory')[self.posix_entry]
+
+    def run_case(self, ace_type, permission, ordering):
+        """Adds ACEs to the original ACL of the fixture according to the ordering and checks the permission"""
+        if permission == 'd' and self.fs.acl_model == 'posix':
+            self.skipTest("DELETE of the object has no POSIX ACL counterpart")
+        is_directory = self.kind == 'directory'
+        ace = nfs4acl.Ace.from_string(ace_type + "::" + self.principal + ":" + permission, is_directory)
+        opposite_ace = nfs4acl.Ace.from_string(
+            opposite_types[ace_type] + "::" + self.principal + ":" + permission, is_directory)
+        added_aces = {'single': [ace], 'first': [ace, opposite_ace], 'second': [opposite_ace, ace]}[ordering]
+        aces = added_aces + self.original_acl
+        logging.debug("ACL:\n" + nfs4acl.format_acl(aces))
+
+        # with the "nfs4" model the first ACE matching the current user decides; if the principal doesn't match
+        # the user, the original ACL decides
+        if self.fs.acl_model == 'posix':
+            expected = self.posix_expected(permission, aces)
+        elif self.principal_matches:
+            expected = added_aces[0].type == nfs4acl.ace_type_letters['A']
+        else:
+            expected = self.is_permitted(permission, self.original_acl)
+        logging.debug("Expected permitted: " + str(expected))
+
+        self.assertEqual(expected, self.is_permitted(permission, aces))
+
+
+def make_test(tc_number, ace_type, permission, principal, kind, ordering):
+    """Returns a test method of the matrix case"""
+
+    def test(self):
+        logging.debug("Starting test: " + str(test.__doc__.split('\n', 1)[0]))
+        self.run_case(ace_type, permission, ordering)
+
+    # the description fits the column of the results table
+    test.__doc__ = "TC{} ACL matrix: {}::{}:{} {}, {}".format(
+        tc_number, ace_type, principal, permission, 'dir' if kind == 'directory' else kind, ordering)
+    return test
+
+
+def make_slices():
+    """Expands the matrix to the test classes, one class per principal and kind of the object"""
+    slices = []
+    tc_number = first_tc_number
+    for principal in matrix['principals']:
+        for kind in matrix['kinds']:
+            attributes = {'__doc__': "NFSv4 ACL matrix: {} on a {}".format(principal, kind),
+                          'principal': principal,
+                          'kind': kind,
+                          'dirname': os.path.join(base_dir_name, "test-" + str(uuid.uuid4()))}
+            for ace_type in matrix['ace_types']:
+                for permission in matrix['permissions']:
+                    if (permission, kind) not in checks:
+                        continue
+                    for ordering in matrix['orderings']:
+                        name = "test_{}_{}_{}_{}".format(ace_type, permission, principal.rstrip('@').lower(), ordering)
+                        attributes[name] = make_test(tc_number, ace_type, permission, principal, kind, ordering)
+                        tc_number += 1
+            class_name = "TestNfs4AclMatrix" + principal.rstrip('@').capitalize() + kind.capitalize()
+            slices.append(type(class_name, (AclMatrixSlice,), attributes))
+    return slices
+
+
+# the slice classes are added to the module, so the test loader finds them
+for slice_class in make_slices():
+    globals()[slice_class.__name__] = slice_class
+del slice_class
+
+
+if __name__ == '__main__':
+    unittest.main()
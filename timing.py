@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Timing of the phases of the running test
+
+A test marks its preparation steps with "with timing.phase('setup'):" and its checks with
+"with timing.phase('assertions'):"; the rest of the test time is the time of the tested operation.
+The phases are reset by the test result object when a test starts.
+"""
+
+import time
+import contextlib
+
+phases = {}  # phase name: elapsed time (seconds) of the running test
+
+
+def reset():
+    """Clears the phases before a new test"""
+    phases.clear()
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Adds the time of the block to the phase of the running test"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start_time